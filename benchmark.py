@@ -1,9 +1,17 @@
 #!/usr/bin/python3
 from __future__ import print_function
+import atexit
+import datetime
 import gc
+import io
+import mmap
 import os
+import random
+import shutil
 import sys
+import tempfile
 import time
+from contextlib import closing
 from operator import itemgetter
 
 pkgdir = os.path.join(os.path.dirname(__file__), 'src')
@@ -14,6 +22,7 @@ from gtimelog.timelog import parse_datetime, TimeLog
 
 
 fns = []
+memory_fns = []
 
 
 def mark(fn):
@@ -21,6 +30,11 @@ def mark(fn):
     return fn
 
 
+def mark_memory(fn):
+    memory_fns.append(fn)
+    return fn
+
+
 def unmark(fn):
     return fn
 
@@ -51,6 +65,17 @@ def benchmark(fn, correct_output):
     print("\rmin {:.3f}s avg {:.3f}s (n={})\n".format(m, tot / n, n))
 
 
+def measure_memory(fn):
+    import tracemalloc  # Python 3 only
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{}: {:.1f} MB (peak {:.1f} MB) for {} items".format(
+        fn.__name__, size / 2.0**20, peak / 2.0**20, len(result)))
+
+
 @unmark
 def just_read():
     filename = Settings().get_timelog_file()
@@ -206,15 +231,93 @@ def parse_and_sort_unicode_piecemeal():
     return items
 
 
+@mark
+def read_text_lines():  # what TimeLog.reread() used to do
+    filename = Settings().get_timelog_file()
+    timelog = TimeLog(io.StringIO(), Settings().virtual_midnight)
+    with open(filename, 'rb') as f:
+        data = f.read()
+    return timelog._read(data.decode('UTF-8').splitlines())
+
+
+@mark
+def read_bytes_mmap():
+    filename = Settings().get_timelog_file()
+    timelog = TimeLog(io.StringIO(), Settings().virtual_midnight)
+    with open(filename, 'rb') as f:
+        with closing(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) as data:
+            return timelog._read_bytes(data)
+
+
 @mark
 def full():
     return TimeLog(Settings().get_timelog_file(), Settings().virtual_midnight).items
 
 
+synthetic_timelog = None
+
+
+def make_synthetic_timelog(filename, years=10):
+    """Write a timelog with `years` years of plausible workdays."""
+    rng = random.Random(42)
+    tasks = ['project%d: task %d' % (n % 7, n) for n in range(150)]
+    tags = ['', '', ' -- dev', ' -- ops', ' -- dev meeting', ' -- admin']
+    day = datetime.date(2020 - years, 1, 1)
+    with io.open(filename, 'w', encoding='UTF-8') as f:
+        while day < datetime.date(2020, 1, 1):
+            if day.weekday() < 5:
+                t = datetime.datetime.combine(day, datetime.time(8, 30))
+                f.write('%s: arrived **\n' % t.strftime('%Y-%m-%d %H:%M'))
+                for n in range(rng.randint(8, 20)):
+                    t += datetime.timedelta(minutes=rng.randint(5, 60))
+                    if rng.random() < 0.15:
+                        entry = rng.choice(['coffee **', 'lunch **',
+                                            'commute ***'])
+                    else:
+                        entry = rng.choice(tasks) + rng.choice(tags)
+                    f.write('%s: %s\n' % (t.strftime('%Y-%m-%d %H:%M'), entry))
+                f.write('\n')
+            day += datetime.timedelta(1)
+
+
+def get_synthetic_timelog():
+    global synthetic_timelog
+    if synthetic_timelog is None:
+        tempdir = tempfile.mkdtemp(prefix='gtimelog-benchmark-')
+        atexit.register(shutil.rmtree, tempdir)
+        synthetic_timelog = os.path.join(tempdir, 'timelog.txt')
+        make_synthetic_timelog(synthetic_timelog)
+    return synthetic_timelog
+
+
+@mark_memory
+def list_items():
+    return TimeLog(Settings().get_timelog_file(), Settings().virtual_midnight).items
+
+
+@mark_memory
+def columnar_items():
+    return TimeLog(Settings().get_timelog_file(), Settings().virtual_midnight,
+                   columnar=True).items
+
+
+@mark_memory
+def synthetic_items():
+    return TimeLog(get_synthetic_timelog(), Settings().virtual_midnight).items
+
+
+@mark_memory
+def synthetic_entries():
+    timelog = TimeLog(get_synthetic_timelog(), Settings().virtual_midnight)
+    return list(timelog.all_entries())
+
+
 def main():
     correct = full()
     for fn in fns:
         benchmark(fn, correct)
+    for fn in memory_fns:
+        measure_memory(fn)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""Benchmark LogView.populate_log() without a display.
+
+Renders the day, week and month views of a synthetic 10-year timelog
+into a Gtk.TextBuffer (which, unlike a Gtk.TextView, doesn't need a
+display), both the way populate_log() does it now (collecting the text
+and applying tags to ranges) and the way it used to (inserting every
+piece of text at the end of the buffer).
+"""
+from __future__ import print_function
+import datetime
+import sys
+import timeit
+import types
+
+import benchmark  # also puts src/ on sys.path
+
+from gtimelog.main import Gtk, LogView
+from gtimelog.settings import Settings
+from gtimelog.timelog import TimeLog
+
+
+class HeadlessLogView(object):
+    """Just enough of a LogView to render into a Gtk.TextBuffer."""
+
+    def __init__(self, timelog, time_range, detail_level='chronological',
+                 filter_text=''):
+        self.buffer = Gtk.TextBuffer()
+        self.timelog = timelog
+        # Far enough from the end of the log to have a full week
+        self.now = timelog.items[-1][0] - datetime.timedelta(14)
+        self.date = self.now.date()
+        self.showing_today = False
+        self.time_range = time_range
+        self.detail_level = detail_level
+        self.filter_text = filter_text
+        self.hours = 8
+        self.office_hours = 9
+        self.current_task = ''
+        self._extended_footer = False
+        self._footer_mark = None
+        self._filter_update_timeout = None
+        self._last_filter = None
+        self._batch = None
+        self._earlier = None
+        self._render_earlier_pending = False
+        self._footer_stats = None
+        self._rendered = None
+        self._rows_end = None
+        self._update_pending = False
+        self.set_up_tags()
+
+    def get_buffer(self):
+        return self.buffer
+
+    def get_vadjustment(self):
+        return None
+
+    def scroll_to_end(self):
+        pass
+
+    def scroll_to_mark(self, *args):
+        pass
+
+    def render_all(self):
+        self.populate_log()
+        while self._earlier is not None:
+            self.render_earlier()
+
+
+# Borrow LogView's methods and settings (but not its GObject properties)
+for name, value in vars(LogView).items():
+    if (isinstance(value, (types.FunctionType, int))
+            and not name.startswith('__')
+            and not hasattr(HeadlessLogView, name)):
+        setattr(HeadlessLogView, name, value)
+
+
+class UnbatchedLogView(HeadlessLogView):
+    """Renders the way populate_log() used to.
+
+    That is, all days at once, with one buffer insert per w() call.
+    """
+
+    render_days = sys.maxsize
+
+    def begin_batch(self):
+        self.buffer.set_text('')
+
+    def end_batch(self, where=None):
+        pass
+
+
+def text_of(view):
+    buffer = view.get_buffer()
+    return buffer.get_text(buffer.get_start_iter(), buffer.get_end_iter(),
+                           True)
+
+
+def measure(fn):
+    fn()
+    return min(timeit.repeat(fn, number=1, repeat=20)) * 1000
+
+
+def main():
+    timelog = TimeLog(benchmark.get_synthetic_timelog(),
+                      Settings().virtual_midnight)
+    print("populate_log() times in ms: unbatched, batched,"
+          " batched visible days only")
+    for time_range in ['day', 'week', 'month']:
+        for detail_level in ['chronological', 'grouped', 'summary']:
+            old = UnbatchedLogView(timelog, time_range, detail_level)
+            new = HeadlessLogView(timelog, time_range, detail_level)
+            results = [measure(old.populate_log), measure(new.render_all),
+                       measure(new.populate_log)]
+            new.render_all()
+            same = text_of(old) == text_of(new)
+            print("{:5} {:13}: {:7.2f} {:7.2f} {:7.2f}{}".format(
+                time_range, detail_level, results[0], results[1], results[2],
+                '' if same else ' [NB different text]'))
+            sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
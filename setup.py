@@ -87,6 +87,9 @@ setup(
         'test:python_version == "2.7"': [
             'mock',
         ],
+        'numpy': [
+            'numpy',
+        ],
     },
     zip_safe=False,
     entry_points="""
@@ -25,6 +25,7 @@ else:
 mark_time()
 mark_time("in script")
 
+import bisect
 import collections
 import datetime
 import email
@@ -39,10 +40,12 @@ import os
 import re
 import signal
 import smtplib
+import threading
 from contextlib import closing
 from email.utils import parseaddr, formataddr
 from gettext import gettext as _
 from io import StringIO
+from operator import itemgetter
 
 mark_time("Python imports done")
 
@@ -86,8 +89,8 @@ mark_time("Gtk imports done")
 from gtimelog import __version__
 from gtimelog.settings import Settings
 from gtimelog.timelog import (
-    as_minutes, virtual_day, different_days, prev_month, next_month, uniq, parse_time,
-    Reports, ReportRecord, TaskList, TimeLog)
+    as_minutes, virtual_day, prev_month, next_month, parse_time,
+    EntryHistory, Reports, ReportRecord, TaskList, TimeLog)
 
 
 if str is bytes:
@@ -639,6 +642,98 @@ def swap_widget(builder, name, replacement):
     original.destroy()
 
 
+class ReloadScheduler(object):
+    """Coalesce file change notifications into a single reload.
+
+    Every event (re)starts a short timer; the reload runs when the timer
+    fires, or at once for events that say the change is complete.  At most
+    one reload is pending at any time.
+
+    The counters tell how well this works: ``events`` is the number of
+    notifications seen, ``merged`` how many of them were folded into an
+    already pending reload, ``checks`` how many times ``check`` was called
+    and ``reloads`` how many of those calls reported an actual reload.
+    """
+
+    delay = 1  # seconds
+
+    def __init__(self, name, check):
+        self.name = name
+        self.check = check
+        self._timeout = None
+        self.events = 0
+        self.merged = 0
+        self.checks = 0
+        self.reloads = 0
+
+    @property
+    def pending(self):
+        return self._timeout is not None
+
+    def event(self, done=False):
+        self.events += 1
+        if self._timeout is not None:
+            GLib.source_remove(self._timeout)
+            self._timeout = None
+            self.merged += 1
+        if done:
+            self.run()
+        else:
+            self._timeout = GLib.timeout_add_seconds(self.delay, self.run)
+
+    def run(self):
+        self._timeout = None
+        self.checks += 1
+        if self.check():
+            self.reloads += 1
+        log.debug('%s: %d events, %d merged, %d checks, %d reloads',
+                  self.name, self.events, self.merged, self.checks,
+                  self.reloads)
+        return False
+
+
+class SettingsCache(object):
+    """Python values of GSettings keys.
+
+    Reading a GSettings key means a GVariant round-trip, and some keys
+    (e.g. virtual-midnight) are needed every time the clock ticks or the
+    date changes.  This reads each key once and keeps the value up to date
+    by listening to the 'changed' signal.
+
+    Values are unpacked GVariants (bool, int, float, str, or tuples of
+    those), except for keys listed in ``converters``.
+    """
+
+    converters = {
+        'virtual-midnight': lambda value: datetime.time(*value),
+    }
+
+    def __init__(self, gsettings):
+        self.gsettings = gsettings
+        self._values = {}
+        # GSettings emits 'changed' only for keys that were read while a
+        # handler was connected, so connect before reading anything.
+        gsettings.connect('changed', self.changed)
+
+    def _read(self, key):
+        value = self.gsettings.get_value(key).unpack()
+        convert = self.converters.get(key)
+        if convert is not None:
+            value = convert(value)
+        return value
+
+    def get(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            value = self._values[key] = self._read(key)
+            return value
+
+    def changed(self, gsettings, key):
+        if key in self._values:
+            self._values[key] = self._read(key)
+
+
 REPORT_KINDS = {
     # map time_range values to report_kind values
     'day': ReportRecord.DAILY,
@@ -706,10 +801,14 @@ class Window(Gtk.ApplicationWindow):
         Gtk.ApplicationWindow.__init__(self, application=app, icon_name='gtimelog')
 
         self._watches = {}
+        self.timelog_reloader = ReloadScheduler('timelog', self.check_reload)
+        self.tasks_reloader = ReloadScheduler('tasks', self.check_reload_tasks)
         self._download = None
         self._date = None
         self._showing_today = None
         self._window_size_update_timeout = None
+        self._tick_timeout = None
+        self.system_bus = None
         self.editing_remote_tasks = False
         self.timelog = None
         self.tasks = None
@@ -819,15 +918,16 @@ class Window(Gtk.ApplicationWindow):
         GLib.idle_add(self.load_log)
         GLib.idle_add(self.load_tasks)
         self.tick(True)
-        # In theory we could wake up once every 60 seconds.  Shame that
-        # there's no timeout_add_minutes.  I don't want to use
-        # timeout_add_seconds(60) because that wouldn't be aligned to a
-        # minute boundary, so we would delay updating the current time
-        # unnecessarily.
-        GLib.timeout_add_seconds(1, self.tick)
+        self.schedule_tick()
+        # Timeouts don't run while the computer is suspended, so we need
+        # to catch up on resume.
+        Gio.bus_get(Gio.BusType.SYSTEM, None, self.got_system_bus)
 
     def load_settings(self):
         self.gsettings = Gio.Settings.new("org.gtimelog")
+        # This must come before the other 'changed' handlers, so they see
+        # the new values.
+        self.settings_cache = SettingsCache(self.gsettings)
         self.gsettings.bind('detail-level', self, 'detail-level', Gio.SettingsBindFlags.DEFAULT)
         self.gsettings.bind('show-task-pane', self.task_pane, 'visible', Gio.SettingsBindFlags.DEFAULT)
         self.gsettings.bind('hours', self.log_view, 'hours', Gio.SettingsBindFlags.DEFAULT)
@@ -844,9 +944,9 @@ class Window(Gtk.ApplicationWindow):
         self.gsettings.connect('changed::virtual-midnight', self.virtual_midnight_changed)
         self.update_edit_tasks_availability()
 
-        x, y = self.gsettings.get_value('window-position')
-        w, h = self.gsettings.get_value('window-size')
-        tpp = self.gsettings.get_int('task-pane-position')
+        x, y = self.settings_cache.get('window-position')
+        w, h = self.settings_cache.get('window-size')
+        tpp = self.settings_cache.get('task-pane-position')
         self.resize(w, h)
         if (x, y) != (-1, -1):
             self.move(x, y)
@@ -885,17 +985,51 @@ class Window(Gtk.ApplicationWindow):
 
     def load_log(self):
         mark_time("loading timelog")
-        timelog = TimeLog(Settings().get_timelog_file(), self.get_virtual_midnight())
+        settings = Settings()
+        filename = settings.get_timelog_file()
+        virtual_midnight = self.get_virtual_midnight()
+        # Parsing a big timelog.txt takes a while, so show today's entries
+        # first, and parse the whole file in a background thread.
+        self.timelog = TimeLog(filename, virtual_midnight, today_only=True)
+        mark_time("timelog tail loaded")
+        # Reports need the whole log
+        self.actions.report.set_enabled(False)
+        self.tick(True)
+        self.enable_add_entry()
+        mark_time("timelog tail presented")
+        self.watch_file(filename, self.on_timelog_file_changed)
+        thread = threading.Thread(
+            target=self.load_full_log,
+            args=(filename, virtual_midnight,
+                  settings.get_timelog_cache_file()))
+        thread.daemon = True
+        thread.start()
+
+    def load_full_log(self, filename, virtual_midnight, cache_filename):
+        # This runs in a background thread, so it must not touch any widgets
+        try:
+            timelog = TimeLog(filename, virtual_midnight, cache_filename)
+        except Exception:
+            log.exception("Failed to load %s", filename)
+            return
         mark_time("timelog loaded")
+        GLib.idle_add(self.full_log_loaded, timelog)
+
+    def full_log_loaded(self, timelog):
+        if timelog.virtual_midnight != self.get_virtual_midnight():
+            timelog.virtual_midnight = self.get_virtual_midnight()
+        # Entries might have been added (by us, too) while we were parsing
+        timelog.check_reload()
         self.timelog = timelog
+        self.actions.report.set_enabled(True)
         self.tick(True)
         self.enable_add_entry()
         mark_time("timelog presented")
-        self.watch_file(self.timelog.filename, self.on_timelog_file_changed)
+        return False
 
     def load_tasks(self, *args):
         mark_time("loading tasks")
-        if self.gsettings.get_boolean('remote-task-list'):
+        if self.settings_cache.get('remote-task-list'):
             filename = Settings().get_task_list_cache_file()
             tasks = TaskList(filename)
             self.download_tasks()
@@ -912,8 +1046,8 @@ class Window(Gtk.ApplicationWindow):
         self.update_edit_tasks_availability()
 
     def update_edit_tasks_availability(self, *args):
-        if self.gsettings.get_boolean('remote-task-list'):
-            can_edit_tasks = bool(self.gsettings.get_string('task-list-edit-url'))
+        if self.settings_cache.get('remote-task-list'):
+            can_edit_tasks = bool(self.settings_cache.get('task-list-edit-url'))
         else:
             can_edit_tasks = True
         self.app.actions.edit_tasks.set_enabled(can_edit_tasks)
@@ -954,7 +1088,7 @@ class Window(Gtk.ApplicationWindow):
         # this bug: https://github.com/gtimelog/gtimelog/issues/89
         self.cancel_tasks_download(hide=False)
 
-        url = self.gsettings.get_string('task-list-url')
+        url = self.settings_cache.get('task-list-url')
         if not url:
             log.debug("Not downloading tasks: URL not specified")
             return
@@ -1001,6 +1135,7 @@ class Window(Gtk.ApplicationWindow):
         if self.timelog:
             # This is only partially correct: we're not reloading old logs.
             # (Reloading old logs would also be partially incorrect.)
+            # Note that this rebuilds the timelog's day index.
             self.timelog.virtual_midnight = self.get_virtual_midnight()
 
     def delay_store_window_size(self, *args):
@@ -1013,9 +1148,9 @@ class Window(Gtk.ApplicationWindow):
         position = self.get_position()
         size = self.get_size()
         tpp = self.paned.get_position()
-        old_position = self.gsettings.get_value('window-position')
-        old_size = self.gsettings.get_value('window-size')
-        old_tpp = self.gsettings.get_int('task-pane-position')
+        old_position = self.settings_cache.get('window-position')
+        old_size = self.settings_cache.get('window-size')
+        old_tpp = self.settings_cache.get('task-pane-position')
         if tuple(size) != tuple(old_size):
             self.gsettings.set_value('window-size', GLib.Variant('(ii)', size))
         if tuple(position) != tuple(old_position):
@@ -1077,8 +1212,7 @@ class Window(Gtk.ApplicationWindow):
         return datetime.datetime.now().replace(second=0, microsecond=0)
 
     def get_virtual_midnight(self):
-        h, m = self.gsettings.get_value('virtual-midnight')
-        return datetime.time(h, m)
+        return self.settings_cache.get('virtual-midnight')
 
     def get_today(self):
         return virtual_day(datetime.datetime.now(), self.get_virtual_midnight())
@@ -1234,6 +1368,9 @@ class Window(Gtk.ApplicationWindow):
         if not recipient:
             log.debug("Not sending report: no destination")
             return
+        if self.timelog.today_only:
+            log.debug("Not sending report: time log not loaded yet")
+            return
         try:
             self.send_email(sender, recipient, subject, body)
         except EmailError as e:
@@ -1247,8 +1384,8 @@ class Window(Gtk.ApplicationWindow):
             self.on_cancel_report()
 
     def send_email(self, sender, recipient, subject, body):
-        smtp_server = self.gsettings.get_string('smtp-server')
-        smtp_username = self.gsettings.get_string('smtp-username')
+        smtp_server = self.settings_cache.get('smtp-server')
+        smtp_username = self.settings_cache.get('smtp-username')
         callback = functools.partial(self._send_email, sender, recipient, subject, body)
         if smtp_username:
             start_smtp_password_lookup(smtp_server, smtp_username, callback)
@@ -1256,15 +1393,15 @@ class Window(Gtk.ApplicationWindow):
             callback('')
 
     def _send_email(self, sender, recipient, subject, body, smtp_password):
-        smtp_server = self.gsettings.get_string('smtp-server')
-        smtp_port = self.gsettings.get_int('smtp-port')
-        smtp_username = self.gsettings.get_string('smtp-username')
+        smtp_server = self.settings_cache.get('smtp-server')
+        smtp_port = self.settings_cache.get('smtp-port')
+        smtp_username = self.settings_cache.get('smtp-username')
 
         sender_name, sender_address = parseaddr(sender)
         recipient_name, recipient_address = parseaddr(recipient)
         msg = prepare_message(sender, recipient, subject, body)
 
-        mail_protocol = self.gsettings.get_string('mail-protocol')
+        mail_protocol = self.settings_cache.get('mail-protocol')
         factory, starttls = MAIL_PROTOCOLS[mail_protocol]
         try:
             log.debug('Connecting to %s port %s',
@@ -1327,28 +1464,29 @@ class Window(Gtk.ApplicationWindow):
         # So, plan: react to CHANGES_DONE_HINT at once, but in case some
         # systems/OSes don't ever send it, react to other events after a
         # short delay, so we wouldn't have to reload the file more than
-        # once.
+        # once.  Each new event postpones the pending reload, so the whole
+        # series costs one reload.
         log.debug('watch on %s reports %s', file.get_path(), event_type.value_nick.upper())
-        if event_type == Gio.FileMonitorEvent.CHANGES_DONE_HINT:
-            self.check_reload()
-        else:
-            GLib.timeout_add_seconds(1, self.check_reload)
+        self.timelog_reloader.event(
+            done=event_type == Gio.FileMonitorEvent.CHANGES_DONE_HINT)
 
     def on_tasks_file_changed(self, monitor, file, other_file, event_type):
         log.debug('watch on %s reports %s', file.get_path(), event_type.value_nick.upper())
-        if event_type == Gio.FileMonitorEvent.CHANGES_DONE_HINT:
-            self.check_reload_tasks()
-        else:
-            GLib.timeout_add_seconds(1, self.check_reload_tasks)
+        self.tasks_reloader.event(
+            done=event_type == Gio.FileMonitorEvent.CHANGES_DONE_HINT)
 
     def check_reload(self):
         if self.timelog.check_reload():
             self.notify('timelog')
             self.tick(True)
+            return True
+        return False
 
     def check_reload_tasks(self):
         if self.tasks.check_reload():
             self.notify('tasks')
+            return True
+        return False
 
     def enable_add_entry(self):
         enabled = self.timelog is not None and self.get_current_task()
@@ -1370,6 +1508,42 @@ class Window(Gtk.ApplicationWindow):
         self.task_entry.grab_focus()
         self.task_entry.set_position(-1)
 
+    def schedule_tick(self):
+        # Wake up once a minute, right after the minute changes.  The delay
+        # is recomputed every time, so we don't drift away from the minute
+        # boundary.  (timeout_add_seconds(60) would, and a 1 second timeout
+        # would wake us up 86400 times a day.)
+        if self._tick_timeout is not None:
+            GLib.source_remove(self._tick_timeout)
+        now = datetime.datetime.now()
+        delay = 60000 - now.second * 1000 - now.microsecond // 1000
+        self._tick_timeout = GLib.timeout_add(delay, self.on_tick_timeout)
+
+    def on_tick_timeout(self):
+        self._tick_timeout = None
+        self.tick()
+        self.schedule_tick()
+        return False
+
+    def got_system_bus(self, source, result):
+        try:
+            self.system_bus = Gio.bus_get_finish(result)
+        except GLib.Error as e:
+            log.debug("Cannot connect to the system bus: %s", e)
+            return
+        self.system_bus.signal_subscribe(
+            'org.freedesktop.login1', 'org.freedesktop.login1.Manager',
+            'PrepareForSleep', '/org/freedesktop/login1', None,
+            Gio.DBusSignalFlags.NONE, self.on_prepare_for_sleep)
+
+    def on_prepare_for_sleep(self, connection, sender, path, interface,
+                             signal, parameters):
+        going_to_sleep, = parameters.unpack()
+        if not going_to_sleep:
+            log.debug("Resumed from suspend")
+            self.tick()
+            self.schedule_tick()
+
     def tick(self, force_update=False):
         now = self.get_now()
         if not force_update and now == self.last_tick:
@@ -1407,12 +1581,15 @@ class TaskEntry(Gtk.Entry):
         self.set_up_history()
         self.set_up_completion()
         self.connect('notify::timelog', self.timelog_changed)
-        self.connect('notify::completion-limit', self.timelog_changed)
+        self.connect('notify::completion-limit', self.completion_limit_changed)
         self.connect('changed', self.on_changed)
         self.connect('notify::gtk-completion-enabled', self.gtk_completion_enabled_changed)
 
     def set_up_history(self):
-        self.history = []
+        self.history = EntryHistory()
+        # The items (and how many of them) that self.history has seen
+        self.history_items = None
+        self.history_length = 0
         self.filtered_history = []
         self.history_pos = 0
         self.history_undo = ''
@@ -1420,7 +1597,8 @@ class TaskEntry(Gtk.Entry):
     def set_up_completion(self):
         completion = self.gtk_completion = Gtk.EntryCompletion()
         self.completion_choices = Gtk.ListStore(str)
-        self.completion_choices_as_set = set()
+        # The row (Gtk.TreeIter) of each entry in self.completion_choices
+        self.completion_choice_rows = {}
         completion.set_model(self.completion_choices)
         completion.set_text_column(0)
         if self.gtk_completion_enabled:
@@ -1433,36 +1611,61 @@ class TaskEntry(Gtk.Entry):
             self.set_completion(None)
 
     def timelog_changed(self, *args):
-        mark_time('about to initialize history completion')
-        self.completion_choices_as_set.clear()
-        self.completion_choices.clear()
-        if self.timelog is None:
+        if self.timelog is None or self.timelog.today_only:
+            # Wait for the full log: today's entries make a poor history
+            self.history = EntryHistory()
+            self.history_items = None
+            self.history_length = 0
+            self.completion_limit_changed()
             mark_time('no history')
             return
-        self.history = [item[1] for item in self.timelog.items]
-        mark_time('history prepared')
+        items = self.timelog.items
+        if items is self.history_items and len(items) >= self.history_length:
+            # Usually somebody only appended some entries
+            new_entries = [item[1] for item in items[self.history_length:]]
+            self.history.update(new_entries)
+            for entry in new_entries:
+                self.add_completion_choice(entry)
+        else:
+            mark_time('about to initialize history completion')
+            self.history = EntryHistory(item[1] for item in items)
+            mark_time('history prepared')
+            self.completion_limit_changed()
+        self.history_items = items
+        self.history_length = len(items)
+
+    def completion_limit_changed(self, *args):
+        self.completion_choice_rows.clear()
+        self.completion_choices.clear()
         # if there are duplicate entries, we want to keep the last one
         # e.g. if timelog.items contains [a, b, a, c], we want
         # self.completion_choices to be [b, a, c].
-        entries = []
-        for entry in reversed(self.history):
-            if entry not in self.completion_choices_as_set:
-                entries.append(entry)
-                self.completion_choices_as_set.add(entry)
-        mark_time('unique items selected')
-        for entry in reversed(entries[:self.completion_limit]):
-            self.completion_choices.append([entry])
+        for entry in self.history.recent(self.completion_limit):
+            self.completion_choice_rows[entry] = (
+                self.completion_choices.append([entry]))
         mark_time('history completion initialized')
 
+    def add_completion_choice(self, entry):
+        # Keep the same order as self.history.recent(): most recently
+        # used last
+        row = self.completion_choice_rows.get(entry)
+        if row is not None:
+            self.completion_choices.move_before(row, None)
+            return
+        self.completion_choice_rows[entry] = (
+            self.completion_choices.append([entry]))
+        if len(self.completion_choices) > self.completion_limit:
+            # Forget the least recently used choice
+            first = self.completion_choices.get_iter_first()
+            del self.completion_choice_rows[
+                self.completion_choices.get_value(first, 0)]
+            self.completion_choices.remove(first)
+
     def entry_added(self):
         if self.timelog is None:
             return
-        entry = self.timelog.last_entry().entry
-        self.history.append(entry)
+        self.timelog_changed()
         self.history_pos = 0
-        if entry not in self.completion_choices_as_set:
-            self.completion_choices.append([entry])
-            self.completion_choices_as_set.add(entry)
 
     def on_changed(self, widget):
         self.history_pos = 0
@@ -1482,8 +1685,8 @@ class TaskEntry(Gtk.Entry):
             return
         if self.history_pos == 0:
             self.history_undo = self.get_text()
-            self.filtered_history = uniq([
-                l for l in self.history if l.startswith(self.history_undo)])
+            self.filtered_history = self.history.starting_with(
+                self.history_undo)
         history = self.filtered_history
         new_pos = max(0, min(self.history_pos + delta, len(history)))
         if new_pos == 0:
@@ -1544,6 +1747,18 @@ class LogView(Gtk.TextView):
         self._footer_mark = None
         self._update_pending = False
         self._footer_update_pending = False
+        self._filter_update_timeout = None
+        self._last_filter = None
+        self._batch = None
+        self._earlier = None
+        self._render_earlier_pending = False
+        self._footer_stats = None
+        self._rendered = None
+        self._rows_end = None
+        self._rendered_items = None
+        self._rows = {}
+        self._row_keys = []
+        self._filter_total = None
         self.set_up_tabs()
         self.set_up_tags()
         self.connect('notify::timelog', self.queue_update)
@@ -1555,13 +1770,42 @@ class LogView(Gtk.TextView):
         self.connect('notify::office-hours', self.queue_footer_update)
         self.connect('notify::current-task', self.queue_footer_update)
         self.connect('notify::now', self.queue_footer_update)
-        self.connect('notify::filter-text', self.queue_update)
+        self.connect('notify::filter-text', self.queue_filter_update)
+        self.connect('notify::vadjustment', self.vadjustment_changed)
+
+    # How long to wait for more typing before filtering (in milliseconds)
+    filter_delay = 300
 
     def queue_update(self, *args):
         if not self._update_pending:
             self._update_pending = True
             GLib.idle_add(self.populate_log)
 
+    # How many days of a long chronological view to render at a time
+    render_days = 7
+
+    def vadjustment_changed(self, *args):
+        vadjustment = self.get_vadjustment()
+        if vadjustment is not None:
+            vadjustment.connect('value-changed', self.queue_render_earlier)
+
+    def queue_render_earlier(self, *args):
+        if self._earlier is not None and not self._render_earlier_pending:
+            self._render_earlier_pending = True
+            GLib.idle_add(self.render_earlier)
+
+    def queue_filter_update(self, *args):
+        # Don't redraw the whole log on every keystroke, wait for a pause
+        if self._filter_update_timeout is not None:
+            GLib.source_remove(self._filter_update_timeout)
+        self._filter_update_timeout = GLib.timeout_add(
+            self.filter_delay, self._filter_update)
+
+    def _filter_update(self):
+        self._filter_update_timeout = None
+        self.queue_update()
+        return False
+
     def queue_footer_update(self, *args):
         if not self._footer_update_pending:
             self._footer_update_pending = True
@@ -1596,6 +1840,15 @@ class LogView(Gtk.TextView):
         assert self.timelog is not None
         return self.timelog.window.last_time()
 
+    def still_loading(self):
+        """Is the time log missing the entries this view needs?
+
+        While the full log is being loaded, only today's entries are
+        available.
+        """
+        return self.timelog.today_only and (
+            self.time_range != 'day' or self.date != self.timelog.day)
+
     def get_current_task_time(self):
         last_time = self.get_last_time()
         if last_time is None:
@@ -1613,43 +1866,125 @@ class LogView(Gtk.TextView):
         total_time = total_work + self.get_current_task_work_time()
         return datetime.timedelta(hours=self.hours) - total_time
 
+    def filter_rows(self, search, text_of):
+        """Return the rows of the log view that match self.filter_text.
+
+        ``search()`` finds the matching rows from scratch, and
+        ``text_of(row)`` returns the text of a row for matching.
+
+        The result is remembered, and when the next filter text extends
+        this one (as it does while the user is typing), only the rows
+        that matched before are checked again.
+        """
+        key = (self.timelog, self.timelog.version, self.date,
+               self.time_range, self.detail_level)
+        filter_text = self.filter_text
+        last = self._last_filter
+        if last is not None and last[0] == key and last[1] in filter_text:
+            rows = [row for row in last[2] if filter_text in text_of(row)]
+        else:
+            rows = search()
+        self._last_filter = (key, filter_text, rows)
+        return rows
+
     def populate_log(self):
         self._update_pending = False
-        self.get_buffer().set_text('')
+        if self._filter_update_timeout is not None:
+            # We're about to show the current filter text anyway
+            GLib.source_remove(self._filter_update_timeout)
+            self._filter_update_timeout = None
+        self._earlier = None
+        self._rendered = None
+        if self._footer_mark is not None:
+            # The text is about to go, don't let update_footer() touch it
+            self.get_buffer().delete_mark(self._footer_mark)
+            self._footer_mark = None
+        self._extended_footer = False
         if self.timelog is None:
+            self.get_buffer().set_text('')
             return # not loaded yet
+        if self.still_loading():
+            self.get_buffer().set_text(_('Loading...'))
+            return
         window = self.get_time_window()
+        self.begin_batch()
+        try:
+            total = self._populate_log(window)
+        finally:
+            self.end_batch()
+        self.finish_rows(window, total)
+        self.reposition_cursor()
+        self.add_footer()
+        self.scroll_to_end()
+
+    def _populate_log(self, window):
         total = datetime.timedelta(0)
         if self.detail_level == 'chronological':
-            prev = None
-            for item in window.all_entries():
-                first_of_day = prev is None or different_days(prev, item.start, self.timelog.virtual_midnight)
-                if first_of_day and prev is not None:
-                    self.w("\n")
-                if self.time_range != 'day' and first_of_day:
-                    self.w(_("{0:%A, %Y-%m-%d}\n").format(item.start))
-                if self.filter_text in item.entry:
-                    self.write_item(item)
-                    total += item.duration
-                prev = item.start
+            if self.filter_text:
+                # Only look at the matching entries, thanks to the TitleIndex
+                entries = self.filter_rows(
+                    lambda: list(window.filtered_entries(self.filter_text)),
+                    lambda row: row[1].entry)
+            else:
+                entries = list(enumerate(window.all_entries()))
+            day_starts = window.day_starts()
+            for n, item in entries:
+                total += item.duration
+            if self.time_range != 'day':
+                # Only the end is visible at first, render the rest later
+                entries, day_starts = self.split_earlier(
+                    window, entries, day_starts)
+            self.write_entries(window, entries, day_starts)
         elif self.detail_level == 'grouped':
-            work, slack = window.grouped_entries()
-            for start, entry, duration in work + slack:
-                if self.filter_text in entry:
-                    self.write_group(entry, duration)
-                    total += duration
+            def search():
+                summary = window.summarize()
+                return [(entry, duration, (kind, start, entry))
+                        for kind, groups in enumerate([summary.work,
+                                                       summary.slack])
+                        for start, entry, duration in groups
+                        if self.filter_text in entry]
+            rows = self.filter_rows(search, itemgetter(0))
         elif self.detail_level == 'summary':
-            entries, totals = window.categorized_work_entries()
-            no_cat = totals.pop(None, None)
-            categories = sorted(totals.items())
-            if no_cat is not None:
-                categories = [('no category', no_cat)] + categories
-            for category, duration in categories:
-                if self.filter_text in category:
-                    self.write_group(category, duration)
-                    total += duration
+            def search():
+                totals = window.summarize().category_totals
+                rows = []
+                for category, duration in totals.items():
+                    name = 'no category' if category is None else category
+                    if self.filter_text in name:
+                        # 'no category' goes first
+                        key = (category is not None, category or '')
+                        rows.append((name, duration, key))
+                rows.sort(key=itemgetter(2))
+                return rows
+            rows = self.filter_rows(search, itemgetter(0))
+        else:
+            return total # bug!
+        if self.detail_level != 'chronological':
+            for name, duration, key in rows:
+                self.write_group(name, duration)
+                total += duration
+            # Remember the rows for add_last_entry()
+            self._row_keys = [key for name, duration, key in rows]
+            self._rows = {name: (key, duration)
+                          for name, duration, key in rows}
+        return total
+
+    def finish_rows(self, window, total):
+        """Write the filter total after the rows of the log view.
+
+        Also remembers what the view shows, for add_last_entry().
+        """
+        buffer = self.get_buffer()
+        if self._rows_end is None:
+            self._rows_end = buffer.create_mark(
+                'rows-end', buffer.get_end_iter(), True)
         else:
-            return # bug!
+            buffer.move_mark(self._rows_end, buffer.get_end_iter())
+        self._filter_total = total
+        self._rendered = (self.timelog, self.timelog.version, self.date,
+                          self.time_range, self.detail_level, self.filter_text)
+        # TimeLog.append() replaces the items list if it has to re-sort it
+        self._rendered_items = self.timelog.items
         if self.filter_text:
             self.w('\n')
             args = [
@@ -1672,19 +2007,145 @@ class LogView(Gtk.TextView):
                 args.append((format_duration(per_diem), 'duration'))
                 self.wfmt(_('Total for {0}: {1} ({2} this week, {3} per day)'), *args)
             self.w('\n')
-        self.reposition_cursor()
+
+    def entry_added(self, same_day):
+        if self._update_pending:
+            return # populate_log() will show the new entry
+        if not self.add_last_entry(same_day):
+            self.populate_log()
+
+    def add_last_entry(self, same_day):
+        """Show the entry that was just appended to the time log.
+
+        Updates only the affected row and the totals below it.  Returns
+        False if that's not possible and the whole log view needs to be
+        populated again.
+        """
+        timelog = self.timelog
+        if self._rendered != (timelog, timelog.version - 1, self.date,
+                              self.time_range, self.detail_level,
+                              self.filter_text):
+            return False # the view doesn't show the previous version
+        if timelog.items is not self._rendered_items:
+            return False # the new entry isn't the last one
+        if self.time_range == 'day' and not same_day:
+            return False # the new entry is in a different window
+        window = self.get_time_window()
+        items = window.items
+        if len(items) < 2 or items[-1][0] != timelog.items[-1][0]:
+            return False
+        entry = window.last_entry()
+        info = timelog.entry_info[items[-1][1]]
+        buffer = self.get_buffer()
+        buffer.delete(buffer.get_iter_at_mark(self._rows_end),
+                      buffer.get_end_iter())
+        if self._footer_mark is not None:
+            buffer.delete_mark(self._footer_mark)
+            self._footer_mark = None
+        total = self._filter_total
+        if self.detail_level == 'chronological':
+            midnight = window.virtual_midnight
+            if (virtual_day(items[-2][0], midnight)
+                    != virtual_day(items[-1][0], midnight)):
+                self.write_day_header(window, len(items) - 1)
+            if self.filter_text in entry.entry:
+                self.write_item(entry)
+                total += entry.duration
+        elif self.detail_level == 'grouped':
+            if not info.skipped and self.filter_text in entry.entry:
+                kind = 1 if info.slacking else 0
+                self.update_row(entry.entry, (kind, entry.start, entry.entry),
+                                entry.duration)
+                total += entry.duration
+        elif self.detail_level == 'summary':
+            name = 'no category' if info.category is None else info.category
+            if (not info.skipped and not info.slacking
+                    and self.filter_text in name):
+                key = (info.category is not None, info.category or '')
+                self.update_row(name, key, entry.duration)
+                total += entry.duration
+        self.finish_rows(window, total)
         self.add_footer()
         self.scroll_to_end()
+        return True
 
-    def entry_added(self, same_day):
-        if (self.detail_level == 'chronological' and same_day
-                and not self.filter_text):
-            self.delete_footer()
-            self.write_item(self.timelog.last_entry())
-            self.add_footer()
-            self.scroll_to_end()
+    def update_row(self, name, key, duration):
+        """Add some time to a row of the grouped or summary view."""
+        buffer = self.get_buffer()
+        if name in self._rows:
+            key, old_duration = self._rows[name]
+            duration += old_duration
+            line = bisect.bisect_left(self._row_keys, key)
+            start = buffer.get_iter_at_line(line)
+            end = start.copy()
+            end.forward_line()
+            buffer.delete(start, end)
         else:
-            self.populate_log()
+            line = bisect.bisect_left(self._row_keys, key)
+            self._row_keys.insert(line, key)
+        self._rows[name] = (key, duration)
+        self.begin_batch()
+        self.write_group(name, duration)
+        self.end_batch(buffer.get_iter_at_line(line))
+
+    def write_entries(self, window, entries, day_starts):
+        """Write entries of a chronological view, with day headers.
+
+        ``entries`` are (position, Entry) tuples, and ``day_starts`` are
+        the positions of the first entries of each day (see
+        TimeCollection.day_starts()).
+        """
+        day_starts = iter(day_starts)
+        next_day = next(day_starts, None)
+        for n, item in entries:
+            while next_day is not None and next_day <= n:
+                self.write_day_header(window, next_day)
+                next_day = next(day_starts, None)
+            self.write_item(item)
+        while next_day is not None:
+            self.write_day_header(window, next_day)
+            next_day = next(day_starts, None)
+
+    def split_earlier(self, window, entries, day_starts):
+        """Split off all but the last few days of a chronological view.
+
+        Returns the entries and day starts of the last self.render_days
+        days.  The earlier ones are remembered for render_earlier().
+        """
+        cutoff = max(0, len(day_starts) - self.render_days)
+        if cutoff == 0:
+            self._earlier = None
+            return entries, day_starts
+        # (position,) sorts before any (position, entry) tuple
+        split = bisect.bisect_left(entries, (day_starts[cutoff],))
+        self._earlier = (window, entries[:split], day_starts[:cutoff])
+        return entries[split:], day_starts[cutoff:]
+
+    def render_earlier(self):
+        """Render more of the earlier days of a chronological view.
+
+        Does that only when the user scrolls close to the top (or when
+        there's not enough text to scroll at all).
+        """
+        self._render_earlier_pending = False
+        if self._earlier is None:
+            return False
+        vadjustment = self.get_vadjustment()
+        if (vadjustment is not None
+                and vadjustment.get_value() > vadjustment.get_page_size()):
+            return False
+        window, entries, day_starts = self._earlier
+        entries, day_starts = self.split_earlier(window, entries, day_starts)
+        buffer = self.get_buffer()
+        # Keep the text that the user is looking at in place
+        mark = buffer.create_mark(None, buffer.get_start_iter(), False)
+        self.begin_batch()
+        self.write_entries(window, entries, day_starts)
+        self.end_batch(buffer.get_start_iter())
+        self.scroll_to_mark(mark, 0, True, 0, 0)
+        buffer.delete_mark(mark)
+        self.queue_render_earlier()
+        return False
 
     def reposition_cursor(self):
         where = self.get_buffer().get_end_iter()
@@ -1700,6 +2161,14 @@ class LogView(Gtk.TextView):
     def _scroll_to_end(self):
         buffer = self.get_buffer()
         self.scroll_to_iter(buffer.get_end_iter(), 0, False, 0, 0)
+        self.queue_render_earlier()
+
+    def write_day_header(self, window, n):
+        if n > 0:
+            self.w("\n")
+        if self.time_range != 'day':
+            start = window.items[n][0]
+            self.w(_("{0:%A, %Y-%m-%d}\n").format(start))
 
     def write_item(self, item):
         self.w(format_duration(item.duration), 'duration')
@@ -1715,8 +2184,45 @@ class LogView(Gtk.TextView):
         tag = ('slacking' if '**' in entry else None)
         self.w('\t' + entry + '\n', tag)
 
+    def begin_batch(self):
+        """Start collecting the text written with w() and wfmt().
+
+        Inserting text into the buffer piece by piece takes a buffer call
+        per fragment, so populate_log() collects all of it and replaces
+        the buffer contents in one go with end_batch(), which only needs
+        extra calls for the tagged fragments.
+        """
+        self._batch = []
+
+    def end_batch(self, where=None):
+        """Replace the log buffer contents with the collected text.
+
+        If ``where`` (a Gtk.TextIter) is given, insert the text there
+        instead.
+        """
+        chunks = [(to_unicode(text) if isinstance(text, bytes) else text, tag)
+                  for text, tag in self._batch]
+        self._batch = None
+        buffer = self.get_buffer()
+        text = ''.join(text for text, tag in chunks)
+        if where is not None:
+            offset = where.get_offset()
+            buffer.insert(where, text)
+        else:
+            offset = 0
+            buffer.set_text(text)
+        for text, tag in chunks:
+            end = offset + len(text)
+            if tag:
+                buffer.apply_tag_by_name(tag, buffer.get_iter_at_offset(offset),
+                                         buffer.get_iter_at_offset(end))
+            offset = end
+
     def w(self, text, tag=None):
         """Write some text at the end of the log buffer."""
+        if self._batch is not None:
+            self._batch.append((text, tag))
+            return
         buffer = self.get_buffer()
         if tag:
             buffer.insert_with_tags_by_name(buffer.get_end_iter(), text, tag)
@@ -1761,15 +2267,49 @@ class LogView(Gtk.TextView):
         buffer.delete_mark(self._footer_mark)
         self._footer_mark = None
 
+    def get_footer_stats(self):
+        """Compute the totals shown in the footer.
+
+        Returns (total_work, total_slacking, week_total_work,
+        week_total_slacking, work_days).  The week totals are None unless
+        this is a day view, and then work_days counts the days of the week.
+
+        The footer is refreshed every minute, but these only change when
+        the time log or the date does, so they're cached.
+        """
+        key = (self.timelog, self.timelog.version, self.date, self.time_range)
+        if self._footer_stats is not None and self._footer_stats[0] == key:
+            return self._footer_stats[1]
+        window = self.get_time_window()
+        total_work, total_slacking = window.totals()
+        week_total_work = week_total_slacking = None
+        if self.timelog.today_only:
+            # We don't have the rest of the week yet
+            work_days = 0
+        elif self.time_range == 'day':
+            weekly_window = self.timelog.window_for_week(self.date)
+            week_total_work, week_total_slacking = weekly_window.totals()
+            work_days = weekly_window.count_days()
+        else:
+            work_days = window.count_days()
+        stats = (total_work, total_slacking, week_total_work,
+                 week_total_slacking, work_days)
+        self._footer_stats = (key, stats)
+        return stats
+
     def add_footer(self):
         buffer = self.get_buffer()
         self._footer_mark = buffer.create_mark(
             'footer', buffer.get_end_iter(), True)
-        window = self.get_time_window()
-        total_work, total_slacking = window.totals()
+        (total_work, total_slacking, week_total_work, week_total_slacking,
+         work_days) = self.get_footer_stats()
+        # While the full log is being loaded we have no week totals
+        no_week = self.time_range == 'day' and week_total_work is None
 
         self.w('\n')
-        if self.time_range == 'day':
+        if no_week:
+            fmt1 = fmt2 = _('Total work done: {0}')
+        elif self.time_range == 'day':
             fmt1 = _('Total work done: {0} ({1} this week, {2} per day)')
             fmt2 = _('Total work done: {0} ({1} this week)')
         elif self.time_range == 'week':
@@ -1779,14 +2319,12 @@ class LogView(Gtk.TextView):
             fmt1 = _('Total work done this month: {0} ({1} per day)')
             fmt2 = _('Total work done this month: {0}')
         args = [(format_duration(total_work), 'duration')]
-        if self.time_range == 'day':
-            weekly_window = self.timelog.window_for_week(self.date)
-            week_total_work, week_total_slacking = weekly_window.totals()
-            work_days = weekly_window.count_days()
+        if no_week:
+            per_diem = None
+        elif self.time_range == 'day':
             args.append((format_duration(week_total_work), 'duration'))
             per_diem = week_total_work / max(1, work_days)
         else:
-            work_days = window.count_days()
             per_diem = total_work / max(1, work_days)
         if work_days:
             args.append((format_duration(per_diem), 'duration'))
@@ -1795,7 +2333,9 @@ class LogView(Gtk.TextView):
             self.wfmt(fmt2, *args)
 
         self.w('\n')
-        if self.time_range == 'day':
+        if no_week:
+            fmt1 = fmt2 = _('Total slacking: {0}')
+        elif self.time_range == 'day':
             fmt1 = _('Total slacking: {0} ({1} this week, {2} per day)')
             fmt2 = _('Total slacking: {0} ({1} this week)')
         elif self.time_range == 'week':
@@ -1805,7 +2345,9 @@ class LogView(Gtk.TextView):
             fmt1 = _('Total slacking this month: {0} ({1} per day)')
             fmt2 = _('Total slacking this month: {0}')
         args = [(format_duration(total_slacking), 'duration')]
-        if self.time_range == 'day':
+        if no_week:
+            per_diem = None
+        elif self.time_range == 'day':
             args.append((format_duration(week_total_slacking), 'duration'))
             per_diem = week_total_slacking / max(1, work_days)
         else:
@@ -1938,7 +2480,8 @@ class ReportView(Gtk.TextView):
 
     def update_subject(self, *args):
         self._subject = ''
-        if self.timelog is None or not self.get_visible():
+        if (self.timelog is None or self.timelog.today_only
+                or not self.get_visible()):
             self.notify('subject')
             return # not loaded yet
         window = self.get_time_window()
@@ -1955,7 +2498,8 @@ class ReportView(Gtk.TextView):
     def populate_report(self):
         self._update_pending = False
         self.update_subject()
-        if self.timelog is None or not self.get_visible():
+        if (self.timelog is None or self.timelog.today_only
+                or not self.get_visible()):
             self.get_buffer().set_text('')
             return # not loaded yet
         window = self.get_time_window()
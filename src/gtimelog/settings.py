@@ -88,6 +88,9 @@ class Settings(object):
     def get_timelog_file(self):
         return os.path.join(self.get_data_dir(), 'timelog.txt')
 
+    def get_timelog_cache_file(self):
+        return os.path.join(self.get_data_dir(), 'timelog.cache')
+
     def get_report_log_file(self):
         return os.path.join(self.get_data_dir(), 'sentreports.log')
 
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 """Tests for gtimelog.main"""
 
+import datetime
 import textwrap
 import unittest
 
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
 try:
     # Python 3
     from unittest import mock
@@ -18,6 +24,221 @@ gi.repository.Gtk.MINOR_VERSION = 18
 mock_gi = mock.patch.dict('sys.modules', {'gi': gi, 'gi.repository': gi.repository})
 
 
+class FakeTextIter(object):
+
+    def __init__(self, buffer, offset):
+        self.buffer = buffer
+        self.offset = offset
+
+    def get_offset(self):
+        return self.offset
+
+    def copy(self):
+        return FakeTextIter(self.buffer, self.offset)
+
+    def backward_cursor_position(self):
+        self.offset = max(0, self.offset - 1)
+
+    def forward_line(self):
+        newline = self.buffer.text.find('\n', self.offset)
+        if newline == -1:
+            self.offset = len(self.buffer.text)
+            return False
+        self.offset = newline + 1
+        return True
+
+
+class FakeTextMark(object):
+
+    def __init__(self, offset, left_gravity):
+        self.offset = offset
+        self.left_gravity = left_gravity
+
+
+class FakeTextBuffer(object):
+    """Just enough of a Gtk.TextBuffer for testing LogView.
+
+    Keeps the text and the set of tags of every character, and moves
+    marks around the way GTK does.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self.tags = []
+        self.marks = {}
+        self.anonymous_marks = []
+
+    def contents(self):
+        """Return the text, with [tag]...[/tag] around tagged parts."""
+        result = []
+        current = ()
+        for char, tags in zip(self.text, self.tags):
+            tags = tuple(sorted(tags))
+            if tags != current:
+                result.extend('[/%s]' % tag for tag in current)
+                result.extend('[%s]' % tag for tag in tags)
+                current = tags
+            result.append(char)
+        result.extend('[/%s]' % tag for tag in current)
+        return ''.join(result)
+
+    def create_tag(self, name, **kw):
+        pass
+
+    def get_start_iter(self):
+        return FakeTextIter(self, 0)
+
+    def get_end_iter(self):
+        return FakeTextIter(self, len(self.text))
+
+    def get_iter_at_offset(self, offset):
+        return FakeTextIter(self, offset)
+
+    def get_iter_at_line(self, line):
+        where = self.get_start_iter()
+        for n in range(line):
+            where.forward_line()
+        return where
+
+    def get_iter_at_mark(self, mark):
+        return FakeTextIter(self, mark.offset)
+
+    def set_text(self, text):
+        self.delete(self.get_start_iter(), self.get_end_iter())
+        self.insert(self.get_start_iter(), text)
+
+    def insert(self, where, text):
+        self.insert_with_tags_by_name(where, text)
+
+    def insert_with_tags_by_name(self, where, text, *tags):
+        offset = where.offset
+        self.text = self.text[:offset] + text + self.text[offset:]
+        self.tags[offset:offset] = [set(tags) for char in text]
+        for mark in list(self.marks.values()) + self.anonymous_marks:
+            if mark.offset > offset or (mark.offset == offset
+                                        and not mark.left_gravity):
+                mark.offset += len(text)
+        where.offset = offset + len(text)
+
+    def apply_tag_by_name(self, tag, start, end):
+        for tags in self.tags[start.offset:end.offset]:
+            tags.add(tag)
+
+    def delete(self, start, end):
+        start, end = start.offset, end.offset
+        self.text = self.text[:start] + self.text[end:]
+        del self.tags[start:end]
+        for mark in list(self.marks.values()) + self.anonymous_marks:
+            if mark.offset >= end:
+                mark.offset -= end - start
+            elif mark.offset > start:
+                mark.offset = start
+
+    def create_mark(self, name, where, left_gravity):
+        if name in self.marks:
+            # GTK moves an existing mark with the same name
+            mark = self.marks[name]
+            mark.offset = where.offset
+            return mark
+        mark = FakeTextMark(where.offset, left_gravity)
+        if name is None:
+            self.anonymous_marks.append(mark)
+        else:
+            self.marks[name] = mark
+        return mark
+
+    def move_mark(self, mark, where):
+        mark.offset = where.offset
+
+    def delete_mark(self, mark):
+        if mark in self.anonymous_marks:
+            self.anonymous_marks.remove(mark)
+        for name, value in list(self.marks.items()):
+            if value is mark:
+                del self.marks[name]
+
+    def place_cursor(self, where):
+        pass
+
+
+class FakeTextView(object):
+
+    def __init__(self):
+        self.buffer = FakeTextBuffer()
+        self.vadjustment = None
+
+    def get_buffer(self):
+        return self.buffer
+
+    def get_vadjustment(self):
+        return self.vadjustment
+
+    def get_pango_context(self):
+        return mock.MagicMock()
+
+    def set_tabs(self, tabs):
+        pass
+
+    def connect(self, signal, handler):
+        pass
+
+    def scroll_to_iter(self, *args):
+        pass
+
+    def scroll_to_mark(self, *args):
+        pass
+
+
+class FakeEntry(object):
+
+    def connect(self, signal, handler):
+        pass
+
+    def set_completion(self, completion):
+        pass
+
+
+class FakeListStore(object):
+    """Just enough of a Gtk.ListStore for testing TaskEntry."""
+
+    def __init__(self, *types):
+        self.rows = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def values(self):
+        return [row[0] for row in self.rows]
+
+    def clear(self):
+        del self.rows[:]
+
+    def append(self, row):
+        # A list works as a persistent Gtk.TreeIter
+        row = list(row)
+        self.rows.append(row)
+        return row
+
+    def get_iter_first(self):
+        return self.rows[0] if self.rows else None
+
+    def get_value(self, row, column):
+        return row[column]
+
+    def remove(self, row):
+        self.rows.remove(row)
+
+    def move_before(self, row, position):
+        assert position is None
+        self.rows.remove(row)
+        self.rows.append(row)
+
+
+gi.repository.Gtk.TextView = FakeTextView
+gi.repository.Gtk.Entry = FakeEntry
+gi.repository.Gtk.ListStore = FakeListStore
+
+
 @mock_gi
 class TestEmail(unittest.TestCase):
 
@@ -68,5 +289,376 @@ class TestEmail(unittest.TestCase):
         self.assertEqual(expected, msg.as_string())
 
 
+@mock_gi
+class TestReloadScheduler(unittest.TestCase):
+
+    def make_scheduler(self, results):
+        from gtimelog.main import ReloadScheduler
+        patcher = mock.patch('gtimelog.main.GLib')
+        self.GLib = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.GLib.timeout_add_seconds.side_effect = [1, 2, 3, 4, 5]
+        self.scheduler = ReloadScheduler('test', lambda: results.pop(0))
+
+    def test_events_are_coalesced(self):
+        self.make_scheduler([True])
+        self.scheduler.event()
+        self.scheduler.event()
+        self.scheduler.event()
+        self.assertTrue(self.scheduler.pending)
+        self.assertEqual(self.GLib.source_remove.call_args_list,
+                         [mock.call(1), mock.call(2)])
+        self.assertEqual(self.scheduler.checks, 0)
+        self.assertFalse(self.scheduler.run())
+        self.assertFalse(self.scheduler.pending)
+        self.assertEqual((self.scheduler.events, self.scheduler.merged,
+                          self.scheduler.checks, self.scheduler.reloads),
+                         (3, 2, 1, 1))
+
+    def test_done_event_reloads_at_once(self):
+        self.make_scheduler([True, False])
+        self.scheduler.event()
+        self.scheduler.event(done=True)
+        self.assertFalse(self.scheduler.pending)
+        self.scheduler.event(done=True)
+        self.assertEqual(self.GLib.timeout_add_seconds.call_count, 1)
+        self.assertEqual((self.scheduler.events, self.scheduler.merged,
+                          self.scheduler.checks, self.scheduler.reloads),
+                         (3, 1, 2, 1))
+
+
+@mock_gi
+class TestSettingsCache(unittest.TestCase):
+
+    def make_cache(self, values):
+        from gtimelog.main import SettingsCache
+        gsettings = mock.Mock()
+        gsettings.get_value.side_effect = (
+            lambda key: mock.Mock(unpack=lambda: values[key]))
+        return gsettings, SettingsCache(gsettings)
+
+    def test_values_are_read_once(self):
+        gsettings, cache = self.make_cache({'hours': 8.0})
+        self.assertEqual(cache.get('hours'), 8.0)
+        self.assertEqual(cache.get('hours'), 8.0)
+        gsettings.get_value.assert_called_once_with('hours')
+
+    def test_conversion(self):
+        gsettings, cache = self.make_cache({'virtual-midnight': (2, 30)})
+        self.assertEqual(cache.get('virtual-midnight'), datetime.time(2, 30))
+
+    def test_changes(self):
+        values = {'hours': 8.0, 'name': 'Me'}
+        gsettings, cache = self.make_cache(values)
+        gsettings.connect.assert_called_once_with('changed', cache.changed)
+        cache.get('hours')
+        values['hours'] = 6.0
+        values['name'] = 'You'
+        cache.changed(gsettings, 'hours')
+        cache.changed(gsettings, 'name')
+        self.assertEqual(cache.get('hours'), 6.0)
+        self.assertEqual(gsettings.get_value.call_count, 2)
+        self.assertEqual(cache.get('name'), 'You')
+
+
+def make_timelog(text):
+    from gtimelog.timelog import TimeLog
+    timelog = TimeLog(StringIO(textwrap.dedent(text)), datetime.time(2, 0))
+    timelog.raw_append = lambda line, need_space: None
+    return timelog
+
+
+SAMPLE_LOG = '''\
+    2014-05-26 09:00: arrived
+    2014-05-26 10:30: edx: write tests
+    2014-05-26 11:00: coffee **
+    2014-05-26 12:30: gtimelog: fix bugs
+    2014-05-26 13:00: lunch **
+    2014-05-26 17:00: edx: code review
+
+    2014-05-27 09:00: arrived
+    2014-05-27 11:00: gtimelog: fix bugs
+    2014-05-27 12:00: meeting
+    2014-05-27 18:00: edx: write tests
+
+    2014-05-28 09:00: arrived
+    2014-05-28 10:00: edx: code review
+    2014-05-28 10:15: coffee **
+'''
+
+
+@mock_gi
+class TestLogView(unittest.TestCase):
+
+    def make_view(self, timelog, **kw):
+        from gtimelog.main import LogView
+        view = LogView()
+        view.timelog = timelog
+        view.date = datetime.date(2014, 5, 28)
+        view.showing_today = True
+        view.detail_level = 'chronological'
+        view.time_range = 'day'
+        view.hours = 8
+        view.office_hours = 9
+        view.current_task = ''
+        view.now = datetime.datetime(2014, 5, 28, 12, 0)
+        view.filter_text = ''
+        for name, value in kw.items():
+            setattr(view, name, value)
+        view.populate_log()
+        return view
+
+    def check_add_last_entry(self, entry, now, same_day=True, **kw):
+        timelog = make_timelog(SAMPLE_LOG)
+        view = self.make_view(timelog, **kw)
+        timelog.append(entry, now)
+        self.assertTrue(view.add_last_entry(same_day))
+        expected = self.make_view(timelog, **kw)
+        self.assertEqual(view.get_buffer().contents(),
+                         expected.get_buffer().contents())
+
+    def check_all_modes(self, entries):
+        for detail_level in ['chronological', 'grouped', 'summary']:
+            for time_range in ['day', 'week']:
+                for filter_text in ['', 'edx']:
+                    for entry in entries:
+                        self.check_add_last_entry(
+                            entry, datetime.datetime(2014, 5, 28, 12, 0),
+                            detail_level=detail_level, time_range=time_range,
+                            filter_text=filter_text)
+
+    def test_add_last_entry_new_row(self):
+        self.check_all_modes(['edx: write docs', 'gtimelog: release',
+                              'reading **', 'break ***'])
+
+    def test_add_last_entry_existing_row(self):
+        self.check_all_modes(['edx: write tests', 'gtimelog: fix bugs',
+                              'coffee **'])
+
+    def test_add_last_entry_new_day(self):
+        for detail_level in ['chronological', 'grouped', 'summary']:
+            for filter_text in ['', 'edx']:
+                self.check_add_last_entry(
+                    'edx: write tests', datetime.datetime(2014, 5, 29, 9, 0),
+                    same_day=False, detail_level=detail_level,
+                    time_range='week', filter_text=filter_text)
+
+    def test_add_last_entry_new_day_in_day_view(self):
+        timelog = make_timelog(SAMPLE_LOG)
+        view = self.make_view(timelog)
+        timelog.append('arrived', datetime.datetime(2014, 5, 29, 9, 0))
+        self.assertFalse(view.add_last_entry(False))
+
+    def test_add_last_entry_out_of_order(self):
+        timelog = make_timelog(SAMPLE_LOG)
+        view = self.make_view(timelog, time_range='week')
+        timelog.append('meeting', datetime.datetime(2014, 5, 27, 12, 30))
+        self.assertFalse(view.add_last_entry(True))
+
+    def test_add_last_entry_stale_view(self):
+        timelog = make_timelog(SAMPLE_LOG)
+        view = self.make_view(timelog)
+        timelog.append('meeting', datetime.datetime(2014, 5, 28, 11, 0))
+        timelog.append('lunch **', datetime.datetime(2014, 5, 28, 12, 0))
+        self.assertFalse(view.add_last_entry(True))
+
+    def test_batch(self):
+        for detail_level in ['chronological', 'grouped', 'summary']:
+            for time_range in ['day', 'week']:
+                for filter_text in ['', 'edx']:
+                    kw = dict(detail_level=detail_level,
+                              time_range=time_range, filter_text=filter_text)
+                    with mock.patch('gtimelog.main.LogView.begin_batch',
+                                    lambda view: view.get_buffer().set_text('')):
+                        with mock.patch('gtimelog.main.LogView.end_batch',
+                                        lambda view, where=None: None):
+                            unbatched = self.make_view(
+                                make_timelog(SAMPLE_LOG), **kw)
+                    batched = self.make_view(make_timelog(SAMPLE_LOG), **kw)
+                    self.assertEqual(batched.get_buffer().contents(),
+                                     unbatched.get_buffer().contents())
+
+    def test_no_footer_while_loading(self):
+        timelog = make_timelog(SAMPLE_LOG)
+        timelog.today_only = True
+        timelog.day = datetime.date(2014, 5, 28)
+        view = self.make_view(timelog)
+        self.assertIn('Total work done', view.get_buffer().text)
+        view.time_range = 'week'
+        view.populate_log()
+        self.assertEqual(view.get_buffer().text, 'Loading...')
+        view.update_footer()
+        self.assertEqual(view.get_buffer().text, 'Loading...')
+
+    def test_update_row(self):
+        timelog = make_timelog(SAMPLE_LOG)
+        view = self.make_view(timelog, detail_level='summary',
+                              time_range='week')
+        self.assertEqual(view.get_buffer().text.splitlines()[:4], [
+            '1 h 0 min\tno category',
+            '12 h 30 min\tedx',
+            '3 h 30 min\tgtimelog',
+            '',
+        ])
+        view.update_row('edx', (True, 'edx'), datetime.timedelta(hours=2))
+        view.update_row('abc', (True, 'abc'), datetime.timedelta(minutes=5))
+        self.assertEqual(view.get_buffer().text.splitlines()[:5], [
+            '1 h 0 min\tno category',
+            '0 h 5 min\tabc',
+            '14 h 30 min\tedx',
+            '3 h 30 min\tgtimelog',
+            '',
+        ])
+
+
+@mock_gi
+class TestTaskEntry(unittest.TestCase):
+
+    def make_entry(self, timelog, completion_limit):
+        from gtimelog.main import TaskEntry
+        entry = TaskEntry()
+        entry.completion_limit = completion_limit
+        entry.gtk_completion_enabled = True
+        entry.timelog = timelog
+        entry.timelog_changed()
+        return entry
+
+    def test_completion_choices(self):
+        timelog = make_timelog('''\
+            2014-05-27 09:00: a
+            2014-05-27 10:00: b
+            2014-05-27 11:00: c
+        ''')
+        entry = self.make_entry(timelog, 3)
+        self.assertEqual(entry.completion_choices.values(), ['a', 'b', 'c'])
+        for n, title in enumerate(['a', 'd', 'c', 'e', 'e', 'b']):
+            timelog.append(title, datetime.datetime(2014, 5, 27, 12, n))
+            entry.entry_added()
+            self.assertEqual(entry.completion_choices.values(),
+                             entry.history.recent(3))
+        self.assertEqual(entry.completion_choices.values(), ['c', 'e', 'b'])
+        # Same as starting from scratch
+        entry.completion_limit_changed()
+        self.assertEqual(entry.completion_choices.values(), ['c', 'e', 'b'])
+
+
+@mock_gi
+class TestLogViewFilterRows(unittest.TestCase):
+
+    def make_view(self):
+        from gtimelog.main import LogView
+        view = LogView()
+        view.timelog = make_timelog(SAMPLE_LOG)
+        view.date = datetime.date(2014, 5, 28)
+        view.time_range = 'day'
+        view.detail_level = 'grouped'
+        return view
+
+    def filter_rows(self, view, filter_text):
+        view.filter_text = filter_text
+        search = mock.Mock(return_value=['edx: code review', 'edx: tests',
+                                         'coffee'])
+        rows = view.filter_rows(search, lambda row: row)
+        return search.called, rows
+
+    def test_narrowing(self):
+        view = self.make_view()
+        self.assertEqual(self.filter_rows(view, 'e'), (True, [
+            'edx: code review', 'edx: tests', 'coffee']))
+        self.assertEqual(self.filter_rows(view, 'ed'), (False, [
+            'edx: code review', 'edx: tests']))
+        self.assertEqual(self.filter_rows(view, 'edx: t'), (False, [
+            'edx: tests']))
+
+    def test_new_filter_searches_again(self):
+        view = self.make_view()
+        self.filter_rows(view, 'edx')
+        self.assertEqual(self.filter_rows(view, 'coffee'), (True, [
+            'edx: code review', 'edx: tests', 'coffee']))
+
+    def test_changed_view_searches_again(self):
+        view = self.make_view()
+        self.filter_rows(view, 'e')
+        view.time_range = 'week'
+        self.assertTrue(self.filter_rows(view, 'ed')[0])
+
+    def test_changed_timelog_searches_again(self):
+        view = self.make_view()
+        self.filter_rows(view, 'e')
+        view.timelog.append('edx: more tests',
+                            datetime.datetime(2014, 5, 28, 12, 0))
+        self.assertTrue(self.filter_rows(view, 'ed')[0])
+
+
+@mock_gi
+class TestLogViewRenderEarlier(unittest.TestCase):
+
+    def make_log(self):
+        lines = []
+        for day in range(1, 32):
+            date = datetime.date(2014, 5, day)
+            lines += [
+                '%s 09:00: arrived' % date,
+                '%s 11:00: edx: write tests' % date,
+                '%s 12:00: lunch **' % date,
+                '%s 16:00: gtimelog: fix bugs' % date,
+                '',
+            ]
+        return make_timelog('\n'.join(lines))
+
+    def make_view(self, timelog, render_days, filter_text=''):
+        from gtimelog.main import LogView
+        view = LogView()
+        view.render_days = render_days
+        view.timelog = timelog
+        view.date = datetime.date(2014, 5, 20)
+        view.showing_today = False
+        view.detail_level = 'chronological'
+        view.time_range = 'month'
+        view.hours = 8
+        view.office_hours = 9
+        view.current_task = ''
+        view.now = datetime.datetime(2014, 6, 1, 12, 0)
+        view.filter_text = filter_text
+        view.populate_log()
+        return view
+
+    def check_render_earlier(self, filter_text=''):
+        timelog = self.make_log()
+        view = self.make_view(timelog, 7, filter_text)
+        self.assertIsNotNone(view._earlier)
+        self.assertEqual(view.get_buffer().text.count('\nFriday, 2014-05-'), 1)
+        while view._earlier is not None:
+            view.render_earlier()
+        expected = self.make_view(timelog, 1000, filter_text)
+        self.assertIsNone(expected._earlier)
+        self.assertEqual(view.get_buffer().contents(),
+                         expected.get_buffer().contents())
+
+    def test_render_earlier(self):
+        self.check_render_earlier()
+
+    def test_render_earlier_filtered(self):
+        self.check_render_earlier('edx')
+
+    def test_render_earlier_waits_for_scrolling(self):
+        view = self.make_view(self.make_log(), 7)
+        text = view.get_buffer().text
+        view.vadjustment = mock.Mock()
+        view.vadjustment.get_value.return_value = 5000
+        view.vadjustment.get_page_size.return_value = 500
+        view.render_earlier()
+        self.assertEqual(view.get_buffer().text, text)
+        view.vadjustment.get_value.return_value = 0
+        view.render_earlier()
+        self.assertNotEqual(view.get_buffer().text, text)
+
+    def test_short_views_are_rendered_at_once(self):
+        view = self.make_view(self.make_log(), 7)
+        view.time_range = 'week'
+        view.populate_log()
+        self.assertIsNone(view._earlier)
+
+
 def test_suite():
     return unittest.defaultTestLoader.loadTestsFromName(__name__)
@@ -24,8 +24,15 @@ except ImportError:
     # Python 2
     import mock
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from gtimelog.timelog import (
     TimeLog, Reports, ReportRecord, Exports, TaskList, TimeCollection,
+    ColumnarItems, DayIndex, TagIndex, TitleIndex, Entry, EntryInfoCache,
+    EntryHistory,
 )
 
 
@@ -550,6 +557,25 @@ def doctest_Exports_to_csv_daily():
         2008-06-04,0.0,0.0,0.0
         2008-06-05,12.75,1.0,0.5
 
+    Unlike everywhere else, entries are grouped by the calendar date of
+    their start time, not by virtual day; tools that read this file rely
+    on that:
+
+        >>> sampledata = StringIO('''
+        ... 2008-06-03 22:00: start
+        ... 2008-06-04 01:00: late night hacking
+        ... 2008-06-04 01:30: commute ***
+        ... 2008-06-04 12:00: start
+        ... 2008-06-04 12:30: something
+        ... ''')
+
+        >>> window = make_time_window(sampledata, min, max, vm)
+
+        >>> Exports(window).to_csv_daily(sys.stdout)
+        date,day-start (hours),slacking (hours),work (hours)
+        2008-06-03,22.0,0.0,3.0
+        2008-06-04,1.0,0.5,0.5
+
     """
 
 
@@ -1028,6 +1054,482 @@ class TestTimeCollection(unittest.TestCase):
         self.assertEqual(sp('project:'), ('project', ''))
 
 
+class TestColumnarItems(unittest.TestCase):
+
+    items = [
+        (datetime.datetime(2015, 9, 17, 9, 0), 'start **'),
+        (datetime.datetime(2015, 9, 17, 9, 30), 'write code'),
+        (datetime.datetime(2015, 9, 17, 10, 0), 'start **'),
+    ]
+
+    def test_sequence(self):
+        items = ColumnarItems(self.items)
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0], self.items[0])
+        self.assertEqual(items[-1], self.items[-1])
+        self.assertEqual(items[1:], self.items[1:])
+        self.assertEqual(list(items), self.items)
+        self.assertEqual(items, self.items)
+        self.assertNotEqual(items, self.items[:2])
+        self.assertFalse(ColumnarItems())
+
+    def test_titles_are_stored_once(self):
+        items = ColumnarItems(self.items)
+        self.assertEqual(items._titles, ['start **', 'write code'])
+
+    def test_append(self):
+        items = ColumnarItems(self.items[:2])
+        items.append(self.items[2])
+        self.assertEqual(items, self.items)
+
+    def test_sort(self):
+        items = ColumnarItems([self.items[2], self.items[0], self.items[1]])
+        items.sort(key=lambda item: item[0])
+        self.assertEqual(items, self.items)
+
+    def test_timelog(self):
+        timelog = TimeLog(StringIO(TestTagging.TEST_TIMELOG),
+                          datetime.time(2, 0), columnar=True)
+        self.assertIsInstance(timelog.items, ColumnarItems)
+        expected = TimeLog(StringIO(TestTagging.TEST_TIMELOG),
+                           datetime.time(2, 0))
+        self.assertEqual(timelog.items, expected.items)
+        window = timelog.window_for_day(datetime.date(2014, 5, 27))
+        expected_window = expected.window_for_day(datetime.date(2014, 5, 27))
+        self.assertEqual(list(window.all_entries()),
+                         list(expected_window.all_entries()))
+        output = StringIO()
+        Reports(window).daily_report(output, 'me@example.com', 'me')
+        expected_output = StringIO()
+        Reports(expected_window).daily_report(expected_output,
+                                              'me@example.com', 'me')
+        self.assertEqual(output.getvalue(), expected_output.getvalue())
+
+
+class TestEntryInfoCache(unittest.TestCase):
+
+    def test_derived_fields(self):
+        entry_info = EntryInfoCache()
+        info = entry_info['edx: write tests -- edx sysadmin']
+        self.assertEqual(info.title, 'edx: write tests')
+        self.assertEqual(info.tags, frozenset(['edx', 'sysadmin']))
+        self.assertFalse(info.slacking)
+        self.assertFalse(info.skipped)
+        self.assertEqual(info.category, 'edx')
+        info = entry_info['lunch -- ** food']
+        self.assertEqual(info.title, 'lunch **')
+        self.assertTrue(info.slacking)
+        self.assertFalse(info.skipped)
+        self.assertIsNone(info.category)
+        info = entry_info['commute ***']
+        self.assertFalse(info.slacking)
+        self.assertTrue(info.skipped)
+
+    def test_entries_are_parsed_once(self):
+        entry_info = EntryInfoCache()
+        self.assertIs(entry_info['email -- mail'], entry_info['email -- mail'])
+
+    def test_tag_sets_are_shared(self):
+        entry_info = EntryInfoCache()
+        self.assertIs(entry_info['email -- mail work'].tags,
+                      entry_info['more email -- work mail'].tags)
+
+    def test_timelog_entries(self):
+        timelog = TimeLog(StringIO(TestTagging.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        entries = list(timelog.all_entries())
+        self.assertIs(entries[5].tags, entries[-1].tags)
+        self.assertIn('cluster: fix shmmax-shmall issue -- sysadmin hpc',
+                      timelog.entry_info)
+        window = timelog.window_for_day(datetime.date(2014, 5, 27))
+        self.assertIs(window.entry_info, timelog.entry_info)
+
+    def test_entry_text_is_shared(self):
+        timelog = TimeLog(StringIO(u'2014-05-27 10:00: arrived\n'
+                                   u'2014-05-27 11:00: email\n'
+                                   u'2014-05-28 10:00: arrived\n'
+                                   u'2014-05-28 11:00: email\n'),
+                          datetime.time(2, 0))
+        self.assertIs(timelog.items[0][1], timelog.items[2][1])
+        self.assertIs(timelog.items[1][1], timelog.items[3][1])
+        timelog.raw_append = lambda line, need_space: None
+        timelog.append('email', now=datetime.datetime(2014, 5, 28, 12, 0))
+        self.assertIs(timelog.items[-1][1], timelog.items[1][1])
+
+
+class TestEntry(unittest.TestCase):
+
+    def make_entry(self):
+        start = datetime.datetime(2014, 5, 27, 10, 0)
+        stop = datetime.datetime(2014, 5, 27, 11, 30)
+        return Entry(start, stop, stop - start, frozenset(['mail']), 'email')
+
+    def test_behaves_like_a_tuple(self):
+        entry = self.make_entry()
+        start, stop, duration, tags, text = entry
+        self.assertEqual(len(entry), 5)
+        self.assertEqual(entry[2], datetime.timedelta(hours=1, minutes=30))
+        self.assertEqual(entry[-1], 'email')
+        self.assertEqual(entry[3:], (frozenset(['mail']), 'email'))
+        self.assertEqual(tuple(entry), (start, stop, duration, tags, text))
+
+    def test_attributes(self):
+        entry = self.make_entry()
+        self.assertEqual(entry.duration, datetime.timedelta(hours=1, minutes=30))
+        self.assertEqual(entry.entry, 'email')
+        self.assertFalse(hasattr(entry, '__dict__'))
+
+    def test_comparison(self):
+        entry = self.make_entry()
+        self.assertEqual(entry, self.make_entry())
+        self.assertEqual(entry, tuple(entry))
+        self.assertNotEqual(entry, tuple(entry)[:4] + ('lunch',))
+        self.assertNotEqual(entry, 'email')
+        self.assertEqual(hash(entry), hash(tuple(entry)))
+
+    def test_ordering(self):
+        entry = self.make_entry()
+        later = entry._replace(start=entry.stop, stop=entry.stop)
+        self.assertLess(entry, later)
+        self.assertGreater(later, entry)
+        self.assertLessEqual(entry, tuple(entry))
+        self.assertEqual(sorted([later, entry]), [entry, later])
+
+    def test_namedtuple_api(self):
+        entry = self.make_entry()
+        self.assertEqual(entry._fields,
+                         ('start', 'stop', 'duration', 'tags', 'entry'))
+        self.assertEqual(list(entry._asdict().values()), list(entry))
+        lunch = entry._replace(entry='lunch **')
+        self.assertIsInstance(lunch, Entry)
+        self.assertEqual(lunch.entry, 'lunch **')
+        self.assertEqual(lunch[:4], entry[:4])
+        self.assertRaises(ValueError, entry._replace, title='lunch')
+
+    def test_repr(self):
+        entry = self.make_entry()
+        self.assertTrue(repr(entry).startswith(
+            'Entry(start=datetime.datetime(2014, 5, 27, 10, 0), '))
+        self.assertTrue(repr(entry).endswith(", entry='email')"))
+
+
+class TestDayIndex(unittest.TestCase):
+
+    TEST_TIMELOG = textwrap.dedent("""
+        2015-09-15 09:00: start **
+        2015-09-15 17:00: work
+        2015-09-16 01:00: late work
+
+        2015-09-17 09:00: start **
+        2015-09-17 10:00: work
+    """)
+
+    def test_day_range(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        day_index = timelog.day_index
+        self.assertEqual(day_index.day_range(datetime.date(2015, 9, 14)),
+                         (0, 0))
+        self.assertEqual(day_index.day_range(datetime.date(2015, 9, 15)),
+                         (0, 3))
+        self.assertEqual(day_index.day_range(datetime.date(2015, 9, 16)),
+                         (3, 3))
+        self.assertEqual(day_index.day_range(datetime.date(2015, 9, 17)),
+                         (3, 5))
+        self.assertEqual(day_index.day_range(datetime.date(2015, 9, 18)),
+                         (5, 5))
+
+    def test_count_days_and_day_starts(self):
+        day_index = DayIndex([
+            (datetime.datetime(2015, 9, 15, 9, 0), 'start **'),
+            (datetime.datetime(2015, 9, 15, 17, 0), 'work'),
+            (datetime.datetime(2015, 9, 16, 1, 0), 'late work'),
+            (datetime.datetime(2015, 9, 17, 9, 0), 'start **'),
+            (datetime.datetime(2015, 9, 17, 10, 0), 'work'),
+        ], datetime.time(0, 0))
+        self.assertEqual(day_index.count_days(0, 5), 3)
+        self.assertEqual(day_index.count_days(1, 4), 3)
+        self.assertEqual(day_index.count_days(1, 2), 1)
+        self.assertEqual(day_index.count_days(2, 2), 0)
+        self.assertEqual(day_index.day_starts(0, 5), [0, 2, 3])
+        self.assertEqual(day_index.day_starts(1, 4), [0, 1, 2])
+        self.assertEqual(day_index.day_starts(3, 3), [])
+
+    def test_update(self):
+        items = []
+        day_index = DayIndex(items, datetime.time(2, 0))
+        items.append((datetime.datetime(2015, 9, 15, 9, 0), 'start **'))
+        items.append((datetime.datetime(2015, 9, 16, 1, 0), 'late work'))
+        day_index.update()
+        items.append((datetime.datetime(2015, 9, 16, 9, 0), 'start **'))
+        day_index.update()
+        self.assertEqual(len(day_index), 3)
+        self.assertEqual(day_index.count_days(0, 3), 2)
+        self.assertEqual(day_index.day_range(datetime.date(2015, 9, 16)),
+                         (2, 3))
+
+    def test_matches_unindexed_windows(self):
+        timelog = TimeLog(StringIO(TestTagging.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        self.assertIsNotNone(window._indexed_range())
+        unindexed = timelog.window_for_week(datetime.date(2014, 5, 27))
+        unindexed.items = list(unindexed.items)
+        self.assertIsNone(unindexed._indexed_range())
+        self.assertEqual(list(window.all_entries()),
+                         list(unindexed.all_entries()))
+        self.assertEqual(window.count_days(), unindexed.count_days())
+        self.assertEqual(window.day_starts(), unindexed.day_starts())
+
+    def test_totals(self):
+        day_index = DayIndex([
+            (datetime.datetime(2015, 9, 15, 9, 0), 'start **'),
+            (datetime.datetime(2015, 9, 15, 9, 30), 'coffee **'),
+            (datetime.datetime(2015, 9, 15, 10, 0), 'work'),
+            (datetime.datetime(2015, 9, 15, 10, 20), 'commute ***'),
+            (datetime.datetime(2015, 9, 15, 11, 0), 'work -- **'),
+            (datetime.datetime(2015, 9, 16, 9, 0), 'start'),
+            (datetime.datetime(2015, 9, 16, 10, 0), 'work'),
+        ], datetime.time(2, 0))
+        self.assertEqual(day_index.totals(0, 7),
+                         (datetime.timedelta(minutes=90),
+                          datetime.timedelta(minutes=70)))
+        self.assertEqual(day_index.totals(1, 5),
+                         (datetime.timedelta(minutes=30),
+                          datetime.timedelta(minutes=40)))
+        self.assertEqual(day_index.totals(5, 7),
+                         (datetime.timedelta(minutes=60),
+                          datetime.timedelta(0)))
+        self.assertEqual(day_index.totals(4, 5),
+                         (datetime.timedelta(0), datetime.timedelta(0)))
+
+    def test_totals_match_unindexed_windows(self):
+        timelog = TimeLog(StringIO(TestSummary.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        start = datetime.datetime(2014, 5, 25, 0, 0)
+        for hours in range(0, 24 * 4, 5):
+            min = start + datetime.timedelta(hours=hours)
+            for length in (1, 7, 24, 36):
+                window = timelog.window_for(
+                    min, min + datetime.timedelta(hours=length))
+                self.assertIsNotNone(window._indexed_range())
+                unindexed = timelog.window_for(window.min_timestamp,
+                                               window.max_timestamp)
+                unindexed.items = list(unindexed.items)
+                self.assertEqual(window.totals(), unindexed.totals())
+
+    def test_virtual_midnight_change(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        window = timelog.window_for_day(datetime.date(2015, 9, 16))
+        self.assertEqual(window.items, [])
+        timelog.virtual_midnight = datetime.time(0, 0)
+        window = timelog.window_for_day(datetime.date(2015, 9, 16))
+        self.assertEqual(window.items, timelog.items[2:3])
+        self.assertEqual(timelog.count_days(), 3)
+
+    def test_append(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        timelog.raw_append = lambda line, need_space: None
+        timelog.check_reload = lambda: False
+        timelog.append('start **', now=datetime.datetime(2015, 9, 18, 9, 0))
+        self.assertEqual(timelog.count_days(), 3)
+        window = timelog.window_for_day(datetime.date(2015, 9, 18))
+        self.assertEqual(window.items, timelog.items[5:])
+
+
+class TestTagIndex(unittest.TestCase):
+
+    items = [
+        (datetime.datetime(2014, 5, 27, 10, 3), 'arrived'),
+        (datetime.datetime(2014, 5, 27, 10, 13), 'edx: topic -- edx'),
+        (datetime.datetime(2014, 5, 27, 12, 11), 'meeting -- edx meeting'),
+        (datetime.datetime(2014, 5, 27, 17, 3), 'cluster -- sysadmin hpc'),
+        (datetime.datetime(2014, 5, 27, 17, 36), 'pause -- ** hpc'),
+    ]
+
+    def test_positions(self):
+        tag_index = TagIndex(self.items)
+        self.assertEqual(list(tag_index.positions('edx', 0, 5)), [1, 2])
+        self.assertEqual(list(tag_index.positions('edx', 2, 5)), [2])
+        self.assertEqual(list(tag_index.positions('hpc', 0, 4)), [3])
+        self.assertEqual(list(tag_index.positions('hpc', 0, 5)), [3, 4])
+        # '**' is not a tag, see TimeCollection._split_entry_and_tags()
+        self.assertEqual(list(tag_index.positions('**', 0, 5)), [])
+        self.assertEqual(list(tag_index.positions('nope', 0, 5)), [])
+
+    def test_tags(self):
+        tag_index = TagIndex(self.items)
+        self.assertEqual(tag_index.tags(0, 5),
+                         {'edx', 'meeting', 'sysadmin', 'hpc'})
+        self.assertEqual(tag_index.tags(3, 4), {'sysadmin', 'hpc'})
+        self.assertEqual(tag_index.tags(0, 1), set())
+
+    def test_update(self):
+        items = self.items[:2]
+        tag_index = TagIndex(items)
+        tag_index.update()
+        self.assertEqual(len(tag_index), 2)
+        items.extend(self.items[2:])
+        tag_index.update()
+        self.assertEqual(len(tag_index), 5)
+        self.assertEqual(list(tag_index.positions('edx', 0, 5)), [1, 2])
+
+    def test_matches_unindexed_windows(self):
+        timelog = TimeLog(StringIO(TestSummary.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        self.assertIsNotNone(window._indexed_tags())
+        unindexed = timelog.window_for_week(datetime.date(2014, 5, 27))
+        unindexed.items = list(unindexed.items)
+        self.assertIsNone(unindexed._indexed_tags())
+        self.assertEqual(window.set_of_all_tags(),
+                         unindexed.set_of_all_tags())
+        self.assertEqual(window.tag_totals(), unindexed.tag_totals())
+        for tag in window.set_of_all_tags():
+            self.assertEqual(window.totals(tag), unindexed.totals(tag))
+            self.assertEqual(window.totals(tag, filter_text='edx'),
+                             unindexed.totals(tag, filter_text='edx'))
+
+    def test_append(self):
+        timelog = TimeLog(StringIO(TestSummary.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        timelog.raw_append = lambda line, need_space: None
+        timelog.check_reload = lambda: False
+        tag_index = timelog.tag_index
+        tag_index.update()
+        timelog.append('edx: more tests -- edx',
+                       now=datetime.datetime(2014, 5, 28, 10, 0))
+        self.assertIs(timelog.tag_index, tag_index)
+        self.assertEqual(len(tag_index), len(timelog.items))
+        window = timelog.window_for_day(datetime.date(2014, 5, 28))
+        self.assertEqual(window.set_of_all_tags(), {'edx'})
+        self.assertEqual(window.totals('edx'),
+                         (datetime.timedelta(minutes=20),
+                          datetime.timedelta(0)))
+
+
+class TestTitleIndex(unittest.TestCase):
+
+    items = TestTagIndex.items + [
+        (datetime.datetime(2014, 5, 28, 9, 0), 'arrived'),
+        (datetime.datetime(2014, 5, 28, 10, 0), 'edx: topic -- edx'),
+    ]
+
+    def test_trigrams(self):
+        self.assertEqual(TitleIndex.trigrams('edx: topic'),
+                         {'edx', 'dx:', 'x: ', ': t', ' to', 'top', 'opi',
+                          'pic'})
+        self.assertEqual(TitleIndex.trigrams('ab'), set())
+
+    def test_titles(self):
+        title_index = TitleIndex(self.items)
+        self.assertEqual(title_index.titles('topic'), {'edx: topic'})
+        self.assertEqual(title_index.titles('i'),
+                         {'arrived', 'edx: topic', 'meeting'})
+        self.assertEqual(title_index.titles(''), set(title_index._positions))
+        # all of the trigrams match, but not the whole text
+        self.assertEqual(title_index.titles('toptop'), set())
+        # the tags are not part of the title
+        self.assertEqual(title_index.titles('sysadmin'), set())
+        self.assertEqual(title_index.titles('nope'), set())
+
+    def test_positions(self):
+        title_index = TitleIndex(self.items)
+        self.assertEqual(title_index.positions('i', 0, 7), [0, 1, 2, 5, 6])
+        self.assertEqual(title_index.positions('topic', 0, 7), [1, 6])
+        self.assertEqual(title_index.positions('topic', 2, 7), [6])
+        self.assertEqual(title_index.positions('topic', 2, 6), [])
+
+    def test_update(self):
+        items = self.items[:2]
+        title_index = TitleIndex(items)
+        self.assertEqual(title_index.titles('rive'), {'arrived'})
+        self.assertEqual(title_index.titles('ause'), set())
+        items.extend(self.items[2:])
+        self.assertEqual(title_index.titles('ause'), {'pause **'})
+        self.assertEqual(len(title_index), 7)
+        self.assertEqual(title_index.positions('rive', 0, 7), [0, 5])
+
+    def test_matches_unindexed_windows(self):
+        timelog = TimeLog(StringIO(TestSummary.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        self.assertIsNotNone(window._indexed_titles())
+        unindexed = timelog.window_for_week(datetime.date(2014, 5, 27))
+        unindexed.items = list(unindexed.items)
+        self.assertIsNone(unindexed._indexed_titles())
+        for filter_text in ['', 'e', 'edx', 'shmmax', '**', 'nope']:
+            self.assertEqual(window.totals(filter_text=filter_text),
+                             unindexed.totals(filter_text=filter_text))
+            self.assertEqual(list(window.filtered_entries(filter_text)),
+                             list(unindexed.filtered_entries(filter_text)))
+
+    def test_filtered_entries(self):
+        timelog = TimeLog(StringIO(TestSummary.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        window = timelog.window_for_day(datetime.date(2014, 5, 27))
+        entries = list(window.all_entries())
+        self.assertEqual(list(window.filtered_entries('')),
+                         list(enumerate(entries)))
+        self.assertEqual(list(window.filtered_entries('edx')),
+                         [(n, entry) for n, entry in enumerate(entries)
+                          if 'edx' in entry.entry])
+
+    def test_append(self):
+        timelog = TimeLog(StringIO(TestSummary.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        timelog.raw_append = lambda line, need_space: None
+        timelog.check_reload = lambda: False
+        title_index = timelog.title_index
+        self.assertEqual(title_index.titles('brand new'), set())
+        timelog.append('brand new task',
+                       now=datetime.datetime(2014, 5, 28, 10, 0))
+        self.assertIs(timelog.title_index, title_index)
+        self.assertEqual(len(title_index), len(timelog.items))
+        self.assertEqual(title_index.titles('brand new'), {'brand new task'})
+        window = timelog.window_for_day(datetime.date(2014, 5, 28))
+        self.assertEqual(window.totals(filter_text='brand new'),
+                         (datetime.timedelta(minutes=20),
+                          datetime.timedelta(0)))
+
+
+class TestEntryHistory(unittest.TestCase):
+
+    def test_recent(self):
+        history = EntryHistory(['a', 'b', 'a', 'c'])
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history.recent(), ['b', 'a', 'c'])
+        self.assertEqual(history.recent(2), ['a', 'c'])
+        self.assertEqual(history.recent(5), ['b', 'a', 'c'])
+
+    def test_starting_with(self):
+        history = EntryHistory(['edx: topic', 'pause **', 'edx: meeting',
+                                'edx', 'edx: topic', 'ed'])
+        self.assertEqual(history.starting_with('edx'),
+                         ['edx: meeting', 'edx', 'edx: topic'])
+        self.assertEqual(history.starting_with('edx: t'), ['edx: topic'])
+        self.assertEqual(history.starting_with('e'),
+                         ['edx: meeting', 'edx', 'edx: topic', 'ed'])
+        self.assertEqual(history.starting_with(''), history.recent())
+        self.assertEqual(history.starting_with('nope'), [])
+
+    def test_add(self):
+        history = EntryHistory(['a', 'b'])
+        history.add('a')
+        self.assertEqual(history.recent(), ['b', 'a'])
+        history.add('ab')
+        self.assertEqual(history.recent(), ['b', 'a', 'ab'])
+        self.assertEqual(history.starting_with('a'), ['a', 'ab'])
+
+    def test_update(self):
+        history = EntryHistory()
+        history.update(['a', 'b', 'a'])
+        history.update('entry %d' % n for n in range(20))
+        history.update(['b'])
+        self.assertEqual(len(history), 22)
+        self.assertEqual(history.recent(3), ['entry 18', 'entry 19', 'b'])
+        self.assertEqual(len(history.starting_with('entry 1')), 11)
+
+
 class TestTaskList(Mixins, unittest.TestCase):
 
     def test_missing_file(self):
@@ -1100,6 +1602,235 @@ class TestTimeLog(Mixins, unittest.TestCase):
         self.assertTrue(timelog.check_reload())
         self.assertFalse(timelog.check_reload())
 
+    def test_version(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+        '''))
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        version = timelog.version
+        self.assertFalse(timelog.check_reload())
+        self.assertEqual(timelog.version, version)
+        timelog.append('write code', now=datetime.datetime(2015, 9, 17, 9, 30))
+        self.assertGreater(timelog.version, version)
+        version = timelog.version
+        with open(logfile, 'a') as f:
+            f.write('2015-09-17 10:00: write tests\n')
+        self.touch(logfile)
+        self.assertTrue(timelog.check_reload())
+        self.assertGreater(timelog.version, version)
+        version = timelog.version
+        timelog.virtual_midnight = datetime.time(3, 0)
+        self.assertGreater(timelog.version, version)
+
+    def touch(self, filename, delta=1):
+        st = os.stat(filename)
+        os.utime(filename, (st.st_atime, st.st_mtime + delta))
+
+    def test_reloading_appended_lines(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write code
+        '''))
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        with codecs.open(logfile, 'a', encoding='UTF-8') as f:
+            f.write('2015-09-17 10:00: write tests\n')
+        self.touch(logfile)
+        with mock.patch.object(timelog, 'reread') as mock_reread:
+            self.assertTrue(timelog.check_reload())
+            self.assertFalse(timelog.check_reload())
+        self.assertFalse(mock_reread.called)
+        self.assertEqual([entry for time, entry in timelog.items],
+                         ['start **', 'write code', 'write tests'])
+
+    def test_reloading_appended_lines_out_of_order(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write code
+        '''))
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        with codecs.open(logfile, 'a', encoding='UTF-8') as f:
+            f.write('2015-09-17 09:00: forgot this one\n')
+        self.touch(logfile)
+        self.assertTrue(timelog.check_reload())
+        self.assertEqual([entry for time, entry in timelog.items],
+                         ['start **', 'forgot this one', 'write code'])
+
+    def test_reloading_after_append(self):
+        logfile = self.tempfile()
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        timelog.append('start **', now=datetime.datetime(2015, 9, 17, 9, 0))
+        with codecs.open(logfile, 'a', encoding='UTF-8') as f:
+            f.write('2015-09-17 09:30: write code\n')
+        self.touch(logfile)
+        with mock.patch.object(timelog, 'reread') as mock_reread:
+            self.assertTrue(timelog.check_reload())
+        self.assertFalse(mock_reread.called)
+        self.assertEqual(len(timelog.items), 2)
+
+    def test_reloading_edited_file(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write code
+        '''))
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write more code
+            2015-09-17 10:00: write tests
+        '''))
+        self.touch(logfile)
+        self.assertTrue(timelog.check_reload())
+        self.assertEqual([entry for time, entry in timelog.items],
+                         ['start **', 'write more code', 'write tests'])
+
+    def test_reloading_incomplete_last_line(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write'''))
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        with codecs.open(logfile, 'a', encoding='UTF-8') as f:
+            f.write(' code\n')
+        self.touch(logfile)
+        self.assertTrue(timelog.check_reload())
+        self.assertEqual([entry for time, entry in timelog.items],
+                         ['start **', 'write code'])
+
+    def test_reading_bytes_matches_reading_text(self):
+        content = textwrap.dedent(u'''\
+            2015-09-17 09:00: start **
+            # hey: this is not a timestamp
+            2015-09-17 09:30: write code \N{SNOWMAN}\r
+            2015-09-17 25:30: bad time
+            2015-09-17 09:15: fix the clock  -- tag
+
+            2015-09-18 09:00:no space
+            2015-09-18 09:00: last line without newline''')
+        logfile = self.write_file('timelog.txt', content)
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        expected = TimeLog(StringIO(content), datetime.time(2, 0))
+        self.assertEqual(timelog.items, expected.items)
+        self.assertEqual(len(timelog.items), 4)
+
+    def test_reading_empty_file(self):
+        logfile = self.write_file('timelog.txt', '')
+        timelog = TimeLog(logfile, datetime.time(2, 0))
+        self.assertEqual(timelog.items, [])
+
+    @freezegun.freeze_time("2015-09-18 11:00")
+    def test_today_only(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write code
+            2015-09-18 01:00: write more code
+            2015-09-18 09:00: start **
+            2015-09-18 09:30: write tests
+        '''))
+        expected = [
+            (datetime.datetime(2015, 9, 18, 1, 0), 'write more code'),
+            (datetime.datetime(2015, 9, 18, 9, 0), 'start **'),
+            (datetime.datetime(2015, 9, 18, 9, 30), 'write tests'),
+        ]
+        timelog = TimeLog(logfile, datetime.time(2, 0), today_only=True)
+        self.assertEqual(timelog.items, expected)
+        self.assertEqual([e.entry for e in timelog.window.all_entries()],
+                         ['start **', 'write tests'])
+        # Today's entries span several blocks, but we stop when we get
+        # to yesterday's
+        with mock.patch.object(TimeLog, 'tail_block_size', 50):
+            timelog.reread()
+            with open(logfile, 'rb') as f:
+                tail = timelog._tail(f, datetime.datetime(2015, 9, 18, 2, 0))
+        self.assertEqual(timelog.items, expected)
+        self.assertTrue(tail.startswith(b'2015-09-18 01:00'))
+
+    @freezegun.freeze_time("2015-09-18 11:00")
+    def test_today_only_append(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 17:30: write code
+        '''))
+        timelog = TimeLog(logfile, datetime.time(2, 0), today_only=True)
+        self.assertEqual(timelog.window.items, [])
+        self.assertFalse(
+            timelog.valid_time(datetime.datetime(2015, 9, 17, 17, 0)))
+        timelog.append('start **', now=datetime.datetime(2015, 9, 18, 9, 0))
+        with open(logfile) as f:
+            self.assertEqual(f.read(), textwrap.dedent('''\
+                2015-09-17 09:00: start **
+                2015-09-17 17:30: write code
+
+                2015-09-18 09:00: start **
+            '''))
+
+    def test_cache(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write code
+        '''))
+        cachefile = self.tempfile('timelog.cache')
+        timelog = TimeLog(logfile, datetime.time(2, 0), cachefile)
+        self.assertTrue(os.path.exists(cachefile))
+        with mock.patch.object(TimeLog, '_read_bytes', return_value=[]) as mock_read:
+            cached = TimeLog(logfile, datetime.time(2, 0), cachefile)
+        mock_read.assert_called_once_with(b'')
+        self.assertEqual(cached.items, timelog.items)
+
+    def test_cache_appended_lines(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write code
+        '''))
+        cachefile = self.tempfile('timelog.cache')
+        TimeLog(logfile, datetime.time(2, 0), cachefile)
+        with codecs.open(logfile, 'a', encoding='UTF-8') as f:
+            f.write('2015-09-17 10:00: write tests\n')
+        with mock.patch.object(TimeLog, '_read_bytes', wraps=TimeLog(StringIO(), datetime.time(2, 0))._read_bytes) as mock_read:
+            timelog = TimeLog(logfile, datetime.time(2, 0), cachefile)
+        mock_read.assert_called_once_with(b'2015-09-17 10:00: write tests\n')
+        self.assertEqual([entry for time, entry in timelog.items],
+                         ['start **', 'write code', 'write tests'])
+        # the cache was updated
+        with mock.patch.object(TimeLog, '_read_bytes', return_value=[]) as mock_read:
+            cached = TimeLog(logfile, datetime.time(2, 0), cachefile)
+        mock_read.assert_called_once_with(b'')
+        self.assertEqual(cached.items, timelog.items)
+
+    def test_cache_edited_file(self):
+        logfile = self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write code
+        '''))
+        cachefile = self.tempfile('timelog.cache')
+        TimeLog(logfile, datetime.time(2, 0), cachefile)
+        self.write_file('timelog.txt', textwrap.dedent('''\
+            2015-09-17 09:00: start **
+            2015-09-17 09:30: write more code
+        '''))
+        timelog = TimeLog(logfile, datetime.time(2, 0), cachefile)
+        self.assertEqual([entry for time, entry in timelog.items],
+                         ['start **', 'write more code'])
+
+    def test_cache_columnar(self):
+        logfile = self.write_file('timelog.txt', '2015-09-17 09:00: start **\n')
+        cachefile = self.tempfile('timelog.cache')
+        TimeLog(logfile, datetime.time(2, 0), cachefile)
+        timelog = TimeLog(logfile, datetime.time(2, 0), cachefile,
+                          columnar=True)
+        self.assertIsInstance(timelog.items, ColumnarItems)
+        timelog = TimeLog(logfile, datetime.time(2, 0), cachefile,
+                          columnar=True)
+        self.assertIsInstance(timelog.items, ColumnarItems)
+        self.assertEqual(len(timelog.items), 1)
+
+    def test_cache_corrupted(self):
+        logfile = self.write_file('timelog.txt', '2015-09-17 09:00: start **\n')
+        cachefile = self.write_file('timelog.cache', 'garbage')
+        timelog = TimeLog(logfile, datetime.time(2, 0), cachefile)
+        self.assertEqual(len(timelog.items), 1)
+        # and it got rewritten
+        timelog = TimeLog(logfile, datetime.time(2, 0), cachefile)
+        self.assertEqual(len(timelog.items), 1)
+
     def test_window_for_day(self):
         timelog = TimeLog(StringIO(), datetime.time(2, 0))
         window = timelog.window_for_day(datetime.date(2015, 9, 17))
@@ -1127,6 +1858,37 @@ class TestTimeLog(Mixins, unittest.TestCase):
         self.assertEqual(window.min_timestamp, datetime.datetime(2015, 9, 3, 2, 0))
         self.assertEqual(window.max_timestamp, datetime.datetime(2015, 9, 25, 2, 0))
 
+    def test_window_shares_items(self):
+        timelog = TimeLog(StringIO(textwrap.dedent('''
+            2015-09-16 18:00: late work
+            2015-09-17 02:00: start **
+            2015-09-17 09:30: write code
+            2015-09-17 09:30: write more code
+            2015-09-18 01:59: very late work
+            2015-09-18 02:00: start **
+        ''')), datetime.time(2, 0))
+        window = timelog.window_for_day(datetime.date(2015, 9, 17))
+        self.assertEqual(window.items, timelog.items[1:5])
+        self.assertIs(window.items._items, timelog.items)
+        self.assertEqual(window.items[-1], timelog.items[4])
+        self.assertEqual(window.items[1:3], timelog.items[2:4])
+        self.assertRaises(IndexError, lambda: window.items[4])
+        window = timelog.window_for(datetime.datetime(2015, 9, 17, 9, 30),
+                                    datetime.datetime(2015, 9, 17, 9, 31))
+        self.assertEqual(window.items, timelog.items[2:4])
+        window = timelog.window_for_day(datetime.date(2015, 9, 19))
+        self.assertEqual(window.items, [])
+
+    @freezegun.freeze_time("2014-11-13 08:30")
+    def test_append_updates_todays_window(self):
+        timelog = TimeLog(self.tempfile(), datetime.time(2, 0))
+        timelog.append('working on sth', now=datetime.datetime(2014, 11, 12, 18, 0))
+        self.assertEqual(timelog.window.items, [])
+        timelog.append('new day **', now=datetime.datetime(2014, 11, 13, 8, 0))
+        self.assertEqual(timelog.day, datetime.date(2014, 11, 13))
+        self.assertEqual(timelog.window.last_time(),
+                         datetime.datetime(2014, 11, 13, 8, 0))
+
     def test_appending_clears_window_cache(self):
         # Regression test for https://github.com/gtimelog/gtimelog/issues/28
         timelog = TimeLog(self.tempfile(), datetime.time(2, 0))
@@ -1148,6 +1910,23 @@ class TestTimeLog(Mixins, unittest.TestCase):
                               '\n',
                               '2014-11-13 08:00: new day **\n'])
 
+    def test_append_out_of_order(self):
+        timelog = TimeLog(self.tempfile(), datetime.time(2, 0))
+        timelog.append('start **', now=datetime.datetime(2014, 11, 12, 9, 0))
+        timelog.append('start **', now=datetime.datetime(2014, 11, 14, 9, 0))
+        timelog.append('forgot this', now=datetime.datetime(2014, 11, 13, 9, 0))
+        self.assertEqual([item[0] for item in timelog.items], [
+            datetime.datetime(2014, 11, 12, 9, 0),
+            datetime.datetime(2014, 11, 13, 9, 0),
+            datetime.datetime(2014, 11, 14, 9, 0),
+        ])
+        window = timelog.window_for_day(datetime.date(2014, 11, 13))
+        self.assertEqual(list(window.items), [
+            (datetime.datetime(2014, 11, 13, 9, 0), 'forgot this'),
+        ])
+        week = timelog.window_for_week(datetime.date(2014, 11, 13))
+        self.assertEqual(week.count_days(), 3)
+
     @freezegun.freeze_time("2015-05-12 16:27:35.115265")
     def test_append_rounds_the_time(self):
         timelog = TimeLog(self.tempfile(), datetime.time(2, 0))
@@ -1270,6 +2049,249 @@ class TestTotals(unittest.TestCase):
         self.assertEqual(slack, datetime.timedelta(hours=0, minutes=5))
 
 
+class TestSummary(unittest.TestCase):
+
+    TEST_TIMELOG = textwrap.dedent("""
+        2014-05-26 09:00: arrived ***
+        2014-05-26 09:30: edx: write tests -- edx
+        2014-05-26 10:00: coffee ** -- edx
+        2014-05-26 12:00: edx: write tests -- edx
+        2014-05-26 12:30: lunch **
+        2014-05-26 13:00: commute *** -- travel
+
+        2014-05-27 01:30: late hacking -- hpc
+        2014-05-27 10:03: arrived
+        2014-05-27 10:13: edx: introduce topic to new sysadmins -- edx
+        2014-05-27 10:30: email
+        2014-05-27 12:11: meeting: how to support new courses?  -- edx meeting
+        2014-05-27 15:12: edx: write test procedure for EdX instances -- edx sysadmin
+        2014-05-27 17:03: cluster: set-up accounts, etc. -- sysadmin hpc
+        2014-05-27 17:36: off: pause **
+        2014-05-27 17:38: email
+        2014-05-27 19:06: off: dinner & family **
+        2014-05-27 22:19: cluster: fix shmmax-shmall issue -- sysadmin hpc
+        2014-05-27 22:19: cluster: fix shmmax-shmall issue -- sysadmin hpc
+        2014-05-28 09:00: arrived **
+        2014-05-28 09:40: coffee **
+        """)
+
+    def assertSummaryMatches(self, collection):
+        summary = collection.summarize()
+        self.assertEqual(summary.first_entry,
+                         next(iter(collection.all_entries()), None))
+        self.assertEqual((summary.total_work, summary.total_slacking),
+                         collection.totals())
+        self.assertEqual((summary.work, summary.slack),
+                         collection.grouped_entries())
+        self.assertEqual((summary.categories, summary.category_totals),
+                         collection.categorized_work_entries())
+        self.assertEqual(summary.tags, collection.set_of_all_tags())
+        self.assertEqual(summary.tag_totals,
+                         {tag: collection.totals(tag)
+                          for tag in collection.set_of_all_tags()})
+        self.assertEqual(summary.days, collection.count_days())
+
+    def test_matches_other_methods(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        self.assertSummaryMatches(timelog)
+        self.assertSummaryMatches(
+            timelog.window_for_week(datetime.date(2014, 5, 27)))
+        for day in range(25, 29):
+            self.assertSummaryMatches(
+                timelog.window_for_day(datetime.date(2014, 5, day)))
+
+    def test_matches_other_methods_unindexed(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        window.items = list(window.items)
+        self.assertIsNone(window._indexed_range())
+        self.assertSummaryMatches(window)
+
+    def test_matches_other_methods_partial_days(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        start = datetime.datetime(2014, 5, 26, 0, 0)
+        for hours in range(0, 60, 7):
+            min = start + datetime.timedelta(hours=hours)
+            for length in (3, 12, 30):
+                self.assertSummaryMatches(timelog.window_for(
+                    min, min + datetime.timedelta(hours=length)))
+
+    def test_day_summaries(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        days = window.day_summaries()
+        self.assertEqual([day for day, summary in days],
+                         [datetime.date(2014, 5, 26),
+                          datetime.date(2014, 5, 27),
+                          datetime.date(2014, 5, 28)])
+        window.items = list(window.items)
+        unindexed = window.day_summaries()
+        self.assertEqual([day for day, summary in unindexed],
+                         [day for day, summary in days])
+        for (day, summary), (day, expected) in zip(days, unindexed):
+            self.assertEqual(vars(summary), vars(expected))
+        self.assertEqual(days[0][1].total_skipped,
+                         datetime.timedelta(minutes=30))
+
+    def test_day_summaries_are_reused(self):
+        timelog = TimeLog(StringIO(self.TEST_TIMELOG), datetime.time(2, 0))
+        timelog.raw_append = lambda line, need_space: None
+        timelog.check_reload = lambda: False
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        days = dict(window.day_summaries())
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        self.assertIs(dict(window.day_summaries())[datetime.date(2014, 5, 27)],
+                      days[datetime.date(2014, 5, 27)])
+        timelog.append('coding', now=datetime.datetime(2014, 5, 28, 10, 0))
+        window = timelog.window_for_week(datetime.date(2014, 5, 27))
+        new_days = dict(window.day_summaries())
+        self.assertIs(new_days[datetime.date(2014, 5, 27)],
+                      days[datetime.date(2014, 5, 27)])
+        self.assertIsNot(new_days[datetime.date(2014, 5, 28)],
+                         days[datetime.date(2014, 5, 28)])
+        self.assertEqual(new_days[datetime.date(2014, 5, 28)].total_work,
+                         datetime.timedelta(minutes=20))
+        self.assertSummaryMatches(window)
+
+    def test_matches_other_methods_tagging(self):
+        timelog = TimeLog(StringIO(TestTagging.TEST_TIMELOG),
+                          datetime.time(2, 0))
+        self.assertSummaryMatches(timelog)
+
+    def test_empty(self):
+        summary = TimeLog(StringIO(), datetime.time(2, 0)).summarize()
+        self.assertIsNone(summary.first_entry)
+        self.assertEqual(summary.total_work, datetime.timedelta(0))
+        self.assertEqual(summary.tag_totals, {})
+        self.assertEqual(summary.days, 0)
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        if numpy is None:
+            self.skipTest('NumPy is not installed')
+
+    def make_timelog(self):
+        # several months of entries, some with tags, some after midnight
+        lines = []
+        titles = ['arrived **', 'edx: write tests -- edx', 'coffee **',
+                  'email', 'meeting: planning -- edx meeting',
+                  'commute ***', 'cluster: fix it -- hpc',
+                  'lunch ** -- food']
+        time = datetime.datetime(2014, 4, 28, 9, 0)
+        for n in range(1000):
+            lines.append('%s: %s' % (time.strftime('%Y-%m-%d %H:%M'),
+                                     titles[n * 7 % len(titles)]))
+            time += datetime.timedelta(minutes=n * 37 % 211 + 5)
+            if n % 9 == 8:
+                time += datetime.timedelta(hours=n % 13 + 10)
+        return TimeLog(StringIO('\n'.join(lines)), datetime.time(2, 0))
+
+    def windows(self, timelog):
+        yield timelog
+        yield timelog.window_for_day(datetime.date(2014, 5, 6))
+        yield timelog.window_for_week(datetime.date(2014, 5, 6))
+        yield timelog.window_for_month(datetime.date(2014, 6, 6))
+        yield timelog.window_for(datetime.datetime(2014, 5, 6, 13, 0),
+                                 datetime.datetime(2014, 7, 1, 11, 0))
+
+    def unindexed(self, window):
+        unindexed = TimeCollection(window.virtual_midnight)
+        unindexed.items = list(window.items)
+        return unindexed
+
+    def test_matches_pure_python(self):
+        timelog = self.make_timelog()
+        for window in self.windows(timelog):
+            analytics = window.analytics()
+            self.assertIsNotNone(analytics)
+            expected = self.unindexed(window)
+            self.assertIsNone(expected.analytics())
+            self.assertEqual(analytics.totals(), expected.totals())
+            self.assertEqual(analytics.grouped_entries(),
+                             expected.grouped_entries())
+            self.assertEqual(analytics.grouped_entries(skip_first=False),
+                             expected.grouped_entries(skip_first=False))
+            self.assertEqual(analytics.category_totals(),
+                             expected.categorized_work_entries()[1])
+            self.assertEqual(analytics.tag_totals(), expected.tag_totals())
+            self.assertEqual(
+                [(day.date, day.arrival, day.work, day.slacking, day.skipped)
+                 for day in analytics.totals_by('day')],
+                [(date, summary.first_entry.start, summary.total_work,
+                  summary.total_slacking, summary.total_skipped)
+                 for date, summary in expected.day_summaries()])
+
+    def test_seconds_are_not_truncated(self):
+        timelog = TimeLog(StringIO(), datetime.time(2, 0))
+        timelog.raw_append = lambda line, need_space: None
+        start = datetime.datetime(2014, 5, 6, 9, 0)
+        timelog.append('arrived **', now=start)
+        timelog.append('write code', now=start + datetime.timedelta(
+            minutes=30, seconds=30))
+        self.assertIsNotNone(timelog.analytics())
+        work, slack = timelog.grouped_entries()
+        self.assertEqual(work[0][2], datetime.timedelta(seconds=1830))
+        self.assertEqual((work, slack),
+                         self.unindexed(timelog).grouped_entries())
+        self.assertEqual(timelog.analytics().totals(),
+                         self.unindexed(timelog).totals())
+
+    def test_totals_by_week_and_month(self):
+        timelog = self.make_timelog()
+        analytics = timelog.analytics()
+        for period, window_for in [('week', timelog.window_for_week),
+                                   ('month', timelog.window_for_month)]:
+            periods = analytics.totals_by(period)
+            self.assertTrue(periods)
+            for totals in periods:
+                window = window_for(totals.date)
+                self.assertEqual(window.min_timestamp.date(), totals.date)
+                summary = self.unindexed(window).summarize()
+                self.assertEqual(totals.arrival, summary.first_entry.start)
+                self.assertEqual(
+                    (totals.work, totals.slacking, totals.skipped),
+                    (summary.total_work, summary.total_slacking,
+                     summary.total_skipped))
+        self.assertRaises(ValueError, analytics.totals_by, 'year')
+
+    def test_empty(self):
+        timelog = TimeLog(StringIO(), datetime.time(2, 0))
+        analytics = timelog.analytics()
+        self.assertEqual(analytics.totals(),
+                         (datetime.timedelta(0), datetime.timedelta(0)))
+        self.assertEqual(analytics.grouped_entries(), ([], []))
+        self.assertEqual(analytics.tag_totals(), {})
+        self.assertEqual(analytics.totals_by('month'), [])
+
+    def test_append(self):
+        timelog = self.make_timelog()
+        timelog.raw_append = lambda line, need_space: None
+        timelog.check_reload = lambda: False
+        vectors = timelog.day_index.vectors()
+        last = timelog.last_time()
+        timelog.append('email', now=last + datetime.timedelta(minutes=30))
+        timelog.append('edx: more tests -- edx',
+                       now=last + datetime.timedelta(days=1))
+        self.assertIs(timelog.day_index.vectors(), vectors)
+        self.assertEqual(len(vectors), len(timelog.items))
+        window = timelog.window_for_week(last.date())
+        self.assertEqual(window.analytics().grouped_entries(),
+                         self.unindexed(window).grouped_entries())
+        self.assertEqual(window.analytics().tag_totals(),
+                         self.unindexed(window).tag_totals())
+
+    def test_without_numpy(self):
+        timelog = self.make_timelog()
+        with mock.patch('gtimelog.timelog.numpy', None):
+            self.assertIsNone(timelog.analytics())
+            self.assertIsNone(timelog.day_index.vectors())
+            work, slack = timelog.grouped_entries()
+        self.assertEqual((work, slack),
+                         self.unindexed(timelog).grouped_entries())
+
+
 class TestFiltering(unittest.TestCase):
 
     TEST_TIMELOG = textwrap.dedent("""
@@ -4,18 +4,41 @@ Non-GUI bits of gtimelog.
 
 from __future__ import unicode_literals
 
+import array
 import codecs
 import collections
 import csv
 import datetime
+import functools
+import heapq
+import itertools
+import mmap
 import os
 import socket
 import sys
 import re
+from bisect import bisect_left, bisect_right, insort
 from collections import defaultdict
+from contextlib import closing
 from hashlib import md5
 from operator import itemgetter
 
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+try:
+    import numpy
+except ImportError:
+    # NumPy is optional; see VectorIndex
+    numpy = None
+
 
 PY3 = sys.version_info[0] >= 3
 
@@ -25,6 +48,12 @@ def as_minutes(duration):
     return duration.days * 24 * 60 + duration.seconds // 60
 
 
+def as_microseconds(duration):
+    """Convert a datetime.timedelta to an integer number of microseconds."""
+    return ((duration.days * 86400 + duration.seconds) * 1000000
+            + duration.microseconds)
+
+
 def as_hours(duration):
     """Convert a datetime.timedelta to a float number of hours."""
     return duration.days * 24.0 + duration.seconds / (60.0 * 60.0)
@@ -142,7 +171,864 @@ def get_mtime(filename):
         return None
 
 
-Entry = collections.namedtuple('Entry', 'start stop duration tags entry')
+@functools.total_ordering
+class Entry(object):
+    """A timelog entry with its start time, stop time and duration.
+
+    Entries behave like (start, stop, duration, tags, entry) named tuples,
+    so you can unpack them, index them, sort them and compare them with
+    tuples, but they use ``__slots__`` and so take less memory than tuples
+    or named tuples.  ``tags`` and ``entry`` are shared with the
+    EntryInfoCache.
+
+    Unlike named tuples, entries are not tuple instances, so you can't
+    concatenate them with tuples.
+    """
+
+    __slots__ = ('start', 'stop', 'duration', 'tags', 'entry')
+    _fields = __slots__
+
+    def __init__(self, start, stop, duration, tags, entry):
+        self.start = start
+        self.stop = stop
+        self.duration = duration
+        self.tags = tags
+        self.entry = entry
+
+    def _astuple(self):
+        return (self.start, self.stop, self.duration, self.tags, self.entry)
+
+    def _asdict(self):
+        return collections.OrderedDict(zip(self._fields, self._astuple()))
+
+    def _replace(self, **kwargs):
+        values = self._asdict()
+        for name, value in kwargs.items():
+            if name not in values:
+                raise ValueError('Got unexpected field names: %r' % name)
+            values[name] = value
+        return Entry(**values)
+
+    def __iter__(self):
+        return iter(self._astuple())
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __getitem__(self, index):
+        return self._astuple()[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Entry):
+            other = other._astuple()
+        if not isinstance(other, tuple):
+            return NotImplemented
+        return self._astuple() == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __lt__(self, other):
+        if isinstance(other, Entry):
+            other = other._astuple()
+        if not isinstance(other, tuple):
+            return NotImplemented
+        return self._astuple() < other
+
+    def __hash__(self):
+        return hash(self._astuple())
+
+    def __repr__(self):
+        return ('Entry(start=%r, stop=%r, duration=%r, tags=%r, entry=%r)'
+                % self._astuple())
+
+
+EntryInfo = collections.namedtuple(
+    'EntryInfo', 'title tags slacking skipped category')
+
+
+class EntryInfoCache(dict):
+    """Fields derived from the text of timelog entries.
+
+    Maps the text of an entry to an EntryInfo with
+
+      title -- the entry without tags (see TimeCollection._split_entry_and_tags)
+      tags -- a frozenset of tags, shared by all entries with the same tags
+      slacking -- True for slacking entries (with ** but not *** in the title)
+      skipped -- True for entries that don't count (with *** in the title)
+      category -- the category of the title (see TimeCollection.split_category)
+
+    Entries are parsed the first time they're looked up.
+    """
+
+    def __init__(self):
+        super(EntryInfoCache, self).__init__()
+        self._tag_sets = {}
+        self._strings = {}
+
+    def intern(self, entry):
+        """Return a shared copy of the text of an entry.
+
+        Most entries in a timelog repeat, so keeping one string per
+        distinct entry instead of one per line saves a lot of memory.
+        """
+        return self._strings.setdefault(entry, entry)
+
+    def __missing__(self, entry):
+        title, tags = TimeCollection._split_entry_and_tags(entry)
+        tags = frozenset(tags)
+        tags = self._tag_sets.setdefault(tags, tags)
+        skipped = '***' in title
+        slacking = not skipped and '**' in title
+        category = TimeCollection.split_category(title)[0]
+        info = self[entry] = EntryInfo(title, tags, slacking, skipped,
+                                       category)
+        return info
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class ListLikeSequence(Sequence):
+    """A sequence that compares equal to lists with the same items."""
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, ListLikeSequence)):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == list(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+
+class ItemsSlice(ListLikeSequence):
+    """A read-only view of items[start:stop].
+
+    Unlike slicing, this doesn't copy the items.
+    """
+
+    def __init__(self, items, start, stop):
+        self._items = items
+        self.start = start
+        self.stop = stop
+
+    def __repr__(self):
+        return 'ItemsSlice(%r)' % list(self)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('index out of range')
+        return self._items[self.start + index]
+
+    def __iter__(self):
+        items = self._items
+        for index in range(self.start, self.stop):
+            yield items[index]
+
+
+class ColumnarItems(ListLikeSequence):
+    """A compact list of (timestamp, event_title) tuples.
+
+    Timestamps are stored as minutes since the Unix epoch in an array, and
+    event titles are stored once in a table of unique titles and referred to
+    by their index in the table.  This takes a fraction of the memory of a
+    list of tuples, at the cost of creating the tuples on every access.
+
+    Timestamps are truncated to whole minutes.
+    """
+
+    # array typecodes must be native strings on Python 2
+    typecode = str('l')
+
+    def __init__(self, items=()):
+        self._minutes = array.array(self.typecode)
+        self._title_ids = array.array(self.typecode)
+        self._titles = []
+        self._title_index = {}
+        self.extend(items)
+
+    def __repr__(self):
+        return 'ColumnarItems(%r)' % list(self)
+
+    def __len__(self):
+        return len(self._minutes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return (EPOCH + datetime.timedelta(minutes=self._minutes[index]),
+                self._titles[self._title_ids[index]])
+
+    def __iter__(self):
+        titles = self._titles
+        for minutes, title_id in zip(self._minutes, self._title_ids):
+            yield (EPOCH + datetime.timedelta(minutes=minutes),
+                   titles[title_id])
+
+    def append(self, item):
+        time, title = item
+        title_id = self._title_index.get(title)
+        if title_id is None:
+            title_id = self._title_index[title] = len(self._titles)
+            self._titles.append(title)
+        self._minutes.append(as_minutes(time - EPOCH))
+        self._title_ids.append(title_id)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def sort(self, key=None):
+        items = sorted(self, key=key)
+        del self._minutes[:]
+        del self._title_ids[:]
+        self.extend(items)
+
+
+class DayIndex(object):
+    """An index of timestamped items by virtual day.
+
+    Remembers the virtual day (see virtual_day()) of every item, as a date
+    ordinal, and the range of item positions that belong to each day, so
+    that questions like "which items happened on this day?" or "how many
+    days are there?" don't need to look at every item.
+
+    Also keeps running totals of work and slacking time (in seconds), so
+    the totals of any range of items take two subtractions.  (Durations
+    depend on virtual midnight, because entries that start a new day
+    don't count.)
+
+    Summaries of whole days are computed on demand and remembered until
+    new items are appended to that day.
+
+    The items must be sorted by timestamp.  Call update() after appending
+    new items; if the items change in any other way, build a new index.
+    """
+
+    typecode = ColumnarItems.typecode
+
+    def __init__(self, items, virtual_midnight, entry_info=None):
+        self.items = items
+        self.virtual_midnight = virtual_midnight
+        if entry_info is None:
+            entry_info = EntryInfoCache()
+        self.entry_info = entry_info
+        # virtual_day(dt) == (dt - offset).date()
+        self._offset = datetime.datetime.combine(
+            EPOCH.date(), virtual_midnight) - EPOCH
+        # the virtual day of every item
+        self.ordinals = array.array(self.typecode)
+        # every virtual day that has items, and the position of its first item
+        self.days = []
+        self.starts = []
+        # work[n] and slacking[n] are the totals of the first n items
+        self.work = array.array(str('d'), [0])
+        self.slacking = array.array(str('d'), [0])
+        # day ordinal -> Summary
+        self._summaries = {}
+        self._vectors = None
+        self.update()
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def update(self):
+        """Index items that were appended since the last update."""
+        offset = self._offset
+        ordinals = self.ordinals
+        days = self.days
+        work = self.work
+        slacking = self.slacking
+        entry_info = self.entry_info
+        last_day = days[-1] if days else None
+        position = len(ordinals)
+        if position == len(self.items):
+            return
+        # new items might belong to the last day
+        self._summaries.pop(last_day, None)
+        last_time = self.items[position - 1][0] if position else None
+        for time, entry in self.items[position:]:
+            day = (time - offset).toordinal()
+            if day != last_day:
+                days.append(day)
+                self.starts.append(position)
+                last_day = day
+                duration = 0
+            else:
+                duration = (time - last_time).total_seconds()
+            ordinals.append(day)
+            info = entry_info[entry]
+            if info.skipped:
+                duration = 0
+            if info.slacking:
+                work.append(work[-1])
+                slacking.append(slacking[-1] + duration)
+            else:
+                work.append(work[-1] + duration)
+                slacking.append(slacking[-1])
+            last_time = time
+            position += 1
+
+    def day_range(self, date):
+        """Return the (start, stop) range of positions of items on a day."""
+        day = date.toordinal()
+        n = bisect_left(self.days, day)
+        if n == len(self.days):
+            return len(self), len(self)
+        start = self.starts[n]
+        if self.days[n] != day:
+            return start, start
+        if n + 1 < len(self.days):
+            return start, self.starts[n + 1]
+        return start, len(self)
+
+    def count_days(self, start, stop):
+        """Count virtual days of items at positions start..stop."""
+        if start >= stop:
+            return 0
+        return (bisect_right(self.days, self.ordinals[stop - 1])
+                - bisect_left(self.days, self.ordinals[start]))
+
+    def totals(self, start, stop):
+        """Compute total work and slacking of items at positions start..stop.
+
+        The first item doesn't count, because it has no start time.
+        """
+        if stop - start < 2:
+            return datetime.timedelta(0), datetime.timedelta(0)
+        start += 1
+        return (datetime.timedelta(seconds=self.work[stop] - self.work[start]),
+                datetime.timedelta(
+                    seconds=self.slacking[stop] - self.slacking[start]))
+
+    def summaries(self, start, stop):
+        """Summarize every day of items at positions start..stop.
+
+        Returns a list of (date, summary) tuples.
+        """
+        result = []
+        if start >= stop:
+            return result
+        first = bisect_right(self.days, self.ordinals[start]) - 1
+        last = bisect_right(self.days, self.ordinals[stop - 1])
+        for n in range(first, last):
+            day = self.days[n]
+            day_start = self.starts[n]
+            day_stop = self.starts[n + 1] if n + 1 < len(self.days) else len(self)
+            if start <= day_start and day_stop <= stop:
+                summary = self._summaries.get(day)
+                if summary is None:
+                    summary = self._summaries[day] = Summary(
+                        self._entries(day_start, day_stop), days=1)
+            else:
+                # only a part of the day is in the range
+                summary = Summary(self._entries(max(start, day_start),
+                                                min(stop, day_stop)), days=1)
+            result.append((datetime.date.fromordinal(day), summary))
+        return result
+
+    def vectors(self):
+        """Return an up-to-date VectorIndex of the items.
+
+        Returns None if NumPy is not available.
+        """
+        if numpy is None:
+            return None
+        if self._vectors is None:
+            self._vectors = VectorIndex(self)
+        else:
+            self._vectors.update()
+        return self._vectors
+
+    def _entries(self, start, stop):
+        """Iterate over entries of a single day's items[start:stop].
+
+        Yields (Entry, EntryInfo) tuples.
+        """
+        entry_info = self.entry_info
+        last_time = None
+        for time, entry in self.items[start:stop]:
+            if last_time is None:
+                last_time = time
+            info = entry_info[entry]
+            yield (Entry(last_time, time, time - last_time, info.tags,
+                         info.title), info)
+            last_time = time
+
+    def day_starts(self, start, stop):
+        """Return the positions that start a new day in items[start:stop].
+
+        The positions are relative to ``start``, and the first item is
+        always considered to start a new day.
+        """
+        if start >= stop:
+            return []
+        first = bisect_right(self.days, self.ordinals[start])
+        last = bisect_right(self.days, self.ordinals[stop - 1])
+        return [0] + [pos - start for pos in self.starts[first:last]]
+
+
+PeriodTotals = collections.namedtuple(
+    'PeriodTotals', 'date arrival work slacking skipped')
+
+
+class VectorIndex(object):
+    """NumPy arrays that describe timestamped items, for fast analytics.
+
+    Timestamps and entry durations are stored as int64 arrays of
+    microseconds, and entry titles, categories and tags as integer codes, so
+    totals and group-bys over many years of entries can be computed with
+    vectorized operations.
+
+    Requires NumPy.  Use DayIndex.vectors() to get one.
+    """
+
+    WORK, SLACKING, SKIPPED = 0, 1, 2
+
+    def __init__(self, day_index):
+        self.day_index = day_index
+        self.items = day_index.items
+        self.titles = []
+        self.categories = []
+        self.tags = []
+        self._codes = ({}, {}, {})
+        empty = numpy.zeros(0, numpy.int64)
+        self.times = empty          # when each entry stopped
+        self.durations = empty      # duration of each entry
+        self.days = empty           # virtual day ordinals
+        self.kinds = numpy.zeros(0, numpy.int8)
+        self.title_codes = empty
+        self.category_codes = empty
+        # (position, tag code) pairs, sorted by position
+        self.tag_positions = empty
+        self.tag_codes = empty
+        self.update()
+
+    def __len__(self):
+        return len(self.times)
+
+    @staticmethod
+    def _code(values, codes, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def update(self):
+        """Add items that were appended since the last update."""
+        start = len(self)
+        new_items = self.items[start:]
+        if not new_items:
+            return
+        entry_info = self.day_index.entry_info
+        title_codes, category_codes, tag_codes = self._codes
+        times = []
+        kinds = []
+        titles = []
+        categories = []
+        tag_positions = []
+        tags = []
+        for position, (time, entry) in enumerate(new_items, start):
+            times.append(as_microseconds(time - EPOCH))
+            info = entry_info[entry]
+            if info.skipped:
+                kinds.append(self.SKIPPED)
+            elif info.slacking:
+                kinds.append(self.SLACKING)
+            else:
+                kinds.append(self.WORK)
+            titles.append(self._code(self.titles, title_codes, info.title))
+            categories.append(
+                self._code(self.categories, category_codes, info.category))
+            for tag in info.tags:
+                tag_positions.append(position)
+                tags.append(self._code(self.tags, tag_codes, tag))
+        times = numpy.array(times, numpy.int64)
+        days = numpy.array(self.day_index.ordinals[start:len(self.items)],
+                           numpy.int64)
+        # entries that start a new day have no duration
+        if start:
+            durations = numpy.diff(times, prepend=self.times[-1])
+            same_day = numpy.diff(days, prepend=self.days[-1]) == 0
+        else:
+            durations = numpy.diff(times, prepend=times[:1])
+            same_day = numpy.diff(days, prepend=days[:1]) == 0
+        durations[~same_day] = 0
+
+        def append(array, values, dtype=numpy.int64):
+            return numpy.concatenate([array, numpy.array(values, dtype)])
+
+        self.times = append(self.times, times)
+        self.durations = append(self.durations, durations)
+        self.days = append(self.days, days)
+        self.kinds = append(self.kinds, kinds, numpy.int8)
+        self.title_codes = append(self.title_codes, titles)
+        self.category_codes = append(self.category_codes, categories)
+        self.tag_positions = append(self.tag_positions, tag_positions)
+        self.tag_codes = append(self.tag_codes, tags)
+
+    def window(self, start, stop):
+        """Return Analytics for items at positions start..stop."""
+        return Analytics(self, start, stop)
+
+
+class Analytics(object):
+    """Vectorized computations over a range of items of a VectorIndex.
+
+    The results are the same as those of the corresponding TimeCollection
+    methods.
+    """
+
+    def __init__(self, vectors, start, stop):
+        self.vectors = vectors
+        self.start = start
+        self.stop = stop
+        self.times = vectors.times[start:stop]
+        self.durations = vectors.durations[start:stop].copy()
+        if len(self.durations):
+            # the first entry in a window has no duration
+            self.durations[0] = 0
+        self.kinds = vectors.kinds[start:stop]
+
+    @staticmethod
+    def _timedelta(microseconds):
+        return datetime.timedelta(microseconds=int(microseconds))
+
+    def _sum(self, kind, where=Ellipsis):
+        durations = self.durations[where]
+        return self._timedelta(durations[self.kinds[where] == kind].sum())
+
+    def totals(self):
+        """Calculate total time of work and slacking entries."""
+        return (self._sum(VectorIndex.WORK),
+                self._sum(VectorIndex.SLACKING))
+
+    def grouped_entries(self, skip_first=True):
+        """Return consolidated entries, like TimeCollection.grouped_entries()."""
+        vectors = self.vectors
+        keep = self.kinds != VectorIndex.SKIPPED
+        if skip_first and len(keep):
+            keep[0] = False
+        codes = vectors.title_codes[self.start:self.stop][keep]
+        durations = self.durations[keep]
+        starts = (self.times - self.durations)[keep]
+        unique, inverse = numpy.unique(codes, return_inverse=True)
+        totals = numpy.zeros(len(unique), numpy.int64)
+        numpy.add.at(totals, inverse, durations)
+        first = numpy.full(len(unique), numpy.iinfo(numpy.int64).max)
+        numpy.minimum.at(first, inverse, starts)
+        work = []
+        slack = []
+        for code, start, duration in zip(unique.tolist(), first.tolist(),
+                                         totals.tolist()):
+            entry = vectors.titles[code]
+            group = (EPOCH + self._timedelta(start), entry,
+                     self._timedelta(duration))
+            if '**' in entry:
+                slack.append(group)
+            else:
+                work.append(group)
+        work.sort()
+        slack.sort()
+        return work, slack
+
+    def category_totals(self, skip_first=True):
+        """Return {category: total work}.
+
+        This matches the second dict returned by
+        TimeCollection.categorized_work_entries().
+        """
+        work = self.kinds == VectorIndex.WORK
+        if skip_first and len(work):
+            work[0] = False
+        codes = self.vectors.category_codes[self.start:self.stop][work]
+        unique, inverse = numpy.unique(codes, return_inverse=True)
+        totals = numpy.zeros(len(unique), numpy.int64)
+        numpy.add.at(totals, inverse, self.durations[work])
+        categories = self.vectors.categories
+        return {categories[code]: self._timedelta(total)
+                for code, total in zip(unique.tolist(), totals.tolist())}
+
+    def tag_totals(self):
+        """Return {tag: (total_work, total_slacking)} for every tag."""
+        vectors = self.vectors
+        lo, hi = numpy.searchsorted(vectors.tag_positions,
+                                    [self.start, self.stop])
+        positions = vectors.tag_positions[lo:hi] - self.start
+        codes = vectors.tag_codes[lo:hi]
+        durations = self.durations[positions]
+        kinds = self.kinds[positions]
+        work, slacking = [
+            numpy.bincount(codes, numpy.where(kinds == kind, durations, 0),
+                           len(vectors.tags)).astype(numpy.int64)
+            for kind in (VectorIndex.WORK, VectorIndex.SLACKING)]
+        return {vectors.tags[code]: (self._timedelta(work[code]),
+                                     self._timedelta(slacking[code]))
+                for code in numpy.unique(codes).tolist()}
+
+    def totals_by(self, period='day'):
+        """Compute totals per day, week or month.
+
+        Returns a list of PeriodTotals, in chronological order, for every
+        period that has entries.  Days are virtual days, and weeks start
+        on Monday; ``date`` is the first day of the period, ``arrival`` is
+        the time of the first entry in it.
+        """
+        days = self.vectors.days[self.start:self.stop]
+        if period == 'day':
+            keys = days
+        elif period == 'week':
+            # date.fromordinal(1) was a Monday
+            keys = days - (days - 1) % 7
+        elif period == 'month':
+            epoch = EPOCH.date().toordinal()
+            keys = (days - epoch).astype('datetime64[D]').astype(
+                'datetime64[M]').astype('datetime64[D]').astype(
+                numpy.int64) + epoch
+        else:
+            raise ValueError('unknown period: %r' % (period,))
+        if not len(keys):
+            return []
+        starts = numpy.flatnonzero(numpy.diff(keys)) + 1
+        starts = numpy.concatenate([[0], starts])
+        sums = []
+        for kind in (VectorIndex.WORK, VectorIndex.SLACKING,
+                     VectorIndex.SKIPPED):
+            sums.append(numpy.add.reduceat(
+                numpy.where(self.kinds == kind, self.durations, 0), starts))
+        return [
+            PeriodTotals(datetime.date.fromordinal(key),
+                         EPOCH + self._timedelta(arrival),
+                         self._timedelta(work), self._timedelta(slacking),
+                         self._timedelta(skipped))
+            for key, arrival, work, slacking, skipped in zip(
+                keys[starts].tolist(), self.times[starts].tolist(),
+                sums[0].tolist(), sums[1].tolist(), sums[2].tolist())]
+
+
+class TagIndex(object):
+    """An inverted index of timestamped items by tag.
+
+    Remembers the positions of items that carry each tag (see
+    TimeCollection._split_entry_and_tags()), so per-tag totals only need
+    to look at the items that have the tag.
+
+    The index is built lazily, on the first query, and queries index any
+    items that were appended since.  If the items change in any other way,
+    build a new index.
+    """
+
+    typecode = ColumnarItems.typecode
+
+    def __init__(self, items, entry_info=None):
+        self.items = items
+        if entry_info is None:
+            entry_info = EntryInfoCache()
+        self.entry_info = entry_info
+        self._positions = {}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def update(self):
+        """Index items that were appended since the last update."""
+        entry_info = self.entry_info
+        positions = self._positions
+        position = self._length
+        for time, entry in self.items[position:]:
+            if ' -- ' in entry:
+                for tag in entry_info[entry].tags:
+                    if tag not in positions:
+                        positions[tag] = array.array(self.typecode)
+                    positions[tag].append(position)
+            position += 1
+        self._length = position
+
+    def positions(self, tag, start, stop):
+        """Return the positions of items with a tag in items[start:stop]."""
+        self.update()
+        positions = self._positions.get(tag)
+        if positions is None:
+            return []
+        lo = bisect_left(positions, start)
+        hi = bisect_left(positions, stop, lo)
+        return positions[lo:hi]
+
+    def tags(self, start, stop):
+        """Return the set of tags of items[start:stop]."""
+        self.update()
+        tags = set()
+        for tag, positions in self._positions.items():
+            n = bisect_left(positions, start)
+            if n < len(positions) and positions[n] < stop:
+                tags.add(tag)
+        return tags
+
+
+class TitleIndex(object):
+    """A trigram index of timestamped items by entry title.
+
+    Remembers the positions of items with each distinct title (see
+    TimeCollection._split_entry_and_tags()), and which titles contain
+    each trigram (substring of three characters).  Looking for entries
+    that contain some text then only needs to check the titles that
+    contain all of its trigrams, instead of every entry.  Texts shorter
+    than three characters are checked against every distinct title.
+
+    Like TagIndex, the index is built lazily, on the first query, and
+    queries index any items that were appended since.  If the items
+    change in any other way, build a new index.
+    """
+
+    typecode = ColumnarItems.typecode
+
+    def __init__(self, items, entry_info=None):
+        self.items = items
+        if entry_info is None:
+            entry_info = EntryInfoCache()
+        self.entry_info = entry_info
+        self._positions = {}
+        self._trigrams = {}
+        self._matches = {}
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @staticmethod
+    def trigrams(text):
+        """Return the set of trigrams of a text."""
+        return set(text[n:n + 3] for n in range(len(text) - 2))
+
+    def update(self):
+        """Index items that were appended since the last update."""
+        entry_info = self.entry_info
+        positions = self._positions
+        position = self._length
+        for time, entry in self.items[position:]:
+            title = entry_info[entry].title
+            if title not in positions:
+                positions[title] = array.array(self.typecode)
+                for trigram in self.trigrams(title):
+                    self._trigrams.setdefault(trigram, set()).add(title)
+                self._matches.clear()
+            positions[title].append(position)
+            position += 1
+        self._length = position
+
+    def titles(self, text):
+        """Return the set of distinct titles that contain a text."""
+        self.update()
+        matches = self._matches.get(text)
+        if matches is None:
+            if len(text) < 3:
+                candidates = self._positions
+            else:
+                postings = sorted(
+                    (self._trigrams.get(trigram, ())
+                     for trigram in self.trigrams(text)), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+            matches = frozenset(title for title in candidates
+                                if text in title)
+            if len(self._matches) >= 100:
+                self._matches.clear()
+            self._matches[text] = matches
+        return matches
+
+    def positions(self, text, start, stop):
+        """Return the positions of items with titles containing a text.
+
+        Only positions in items[start:stop] are returned, in order.
+        """
+        titles = self.titles(text)
+        if 4 * len(titles) > stop - start:
+            # Bisecting each title costs more than checking each item
+            entry_info = self.entry_info
+            items = self.items
+            return [position for position in range(start, stop)
+                    if entry_info[items[position][1]].title in titles]
+        result = []
+        for title in titles:
+            positions = self._positions[title]
+            lo = bisect_left(positions, start)
+            hi = bisect_left(positions, stop, lo)
+            result.extend(positions[lo:hi])
+        result.sort()
+        return result
+
+
+class EntryHistory(object):
+    """Distinct entries, ordered by when they were last used.
+
+    Entries are also kept in a sorted list, so finding the ones that start
+    with some prefix bisects it instead of looking at every entry.
+    Adding entries updates both orders incrementally.
+    """
+
+    def __init__(self, entries=()):
+        self._last_used = {}
+        self._sorted = []
+        self._counter = 0
+        self.update(entries)
+
+    def __len__(self):
+        return len(self._last_used)
+
+    def add(self, entry):
+        """Remember that an entry was used (most recently)."""
+        self.update([entry])
+
+    def update(self, entries):
+        """Remember that entries were used, in order."""
+        entries = list(entries)
+        last_used = self._last_used
+        new = set(entries).difference(last_used)
+        # later entries overwrite the counters of earlier duplicates
+        last_used.update(zip(entries, itertools.count(self._counter + 1)))
+        self._counter += len(entries)
+        if len(new) > 10:
+            self._sorted = sorted(last_used)
+        else:
+            for entry in new:
+                insort(self._sorted, entry)
+
+    def recent(self, limit=None):
+        """Return the most recently used entries, oldest first."""
+        last_used = self._last_used
+        if limit is None or limit >= len(last_used):
+            return sorted(last_used, key=last_used.get)
+        return sorted(heapq.nlargest(limit, last_used, key=last_used.get),
+                      key=last_used.get)
+
+    def starting_with(self, prefix):
+        """Return the entries that start with a prefix, oldest first."""
+        if not prefix:
+            return self.recent()
+        entries = self._sorted
+        result = []
+        for n in range(bisect_left(entries, prefix), len(entries)):
+            if not entries[n].startswith(prefix):
+                break
+            result.append(entries[n])
+        result.sort(key=self._last_used.get)
+        return result
 
 
 class TimeCollection(object):
@@ -161,10 +1047,96 @@ class TimeCollection(object):
     "start" entries at their end point.
     """
 
+    tag_index = None
+    title_index = None
+    entry_info = None
+
     def __init__(self, virtual_midnight):
         self.items = []
         self.virtual_midnight = virtual_midnight
 
+    def _indexed_range(self):
+        """Return (day_index, start, stop) for self.items, if possible.
+
+        self.items are then day_index.items[start:stop].  Returns None if
+        there's no up-to-date DayIndex for self.items.
+        """
+        return None
+
+    def _indexed_tags(self):
+        """Return (tag_index, day_index, start, stop) for self.items.
+
+        Like _indexed_range(), but also requires an up-to-date TagIndex.
+        """
+        indexed = self._indexed_range()
+        tag_index = self.tag_index
+        if (indexed is None or tag_index is None
+                or tag_index.items is not indexed[0].items):
+            return None
+        return (tag_index,) + indexed
+
+    def _indexed_titles(self):
+        """Return (title_index, day_index, start, stop) for self.items.
+
+        Like _indexed_range(), but also requires an up-to-date TitleIndex.
+        """
+        indexed = self._indexed_range()
+        title_index = self.title_index
+        if (indexed is None or title_index is None
+                or title_index.items is not indexed[0].items):
+            return None
+        return (title_index,) + indexed
+
+    def _indexed_totals(self, day_index, start, positions, filter_text=None):
+        """Compute totals() of the items at the given positions.
+
+        The positions come from a TagIndex or a TitleIndex, and refer to
+        day_index.items; ``start`` is the position of self.items[0].
+        """
+        items = day_index.items
+        ordinals = day_index.ordinals
+        entry_info = day_index.entry_info
+        total_work = total_slacking = datetime.timedelta(0)
+        for position in positions:
+            if position == start or ordinals[position] != ordinals[position - 1]:
+                continue  # the first entry of a day has no duration
+            time, entry = items[position]
+            info = entry_info[entry]
+            if filter_text is not None and filter_text not in info.title:
+                continue
+            if info.skipped:
+                continue
+            duration = time - items[position - 1][0]
+            if info.slacking:
+                total_slacking += duration
+            else:
+                total_work += duration
+        return total_work, total_slacking
+
+    def analytics(self):
+        """Return an Analytics object for vectorized computations.
+
+        Returns None if NumPy is not installed, or if there's no up-to-date
+        DayIndex for self.items.
+        """
+        indexed = self._indexed_range()
+        if numpy is None or indexed is None:
+            return None
+        day_index, start, stop = indexed
+        return day_index.vectors().window(start, stop)
+
+    def _virtual_days(self):
+        """Iterate over the virtual days of all items.
+
+        The days are date ordinals if there's a DayIndex, and dates if not.
+        """
+        indexed = self._indexed_range()
+        if indexed is not None:
+            day_index, start, stop = indexed
+            return day_index.ordinals[start:stop]
+        return (virtual_day(time, self.virtual_midnight)
+                for time, entry in self.items)
+
     def last_time(self):
         """Return the time of the last entry.
 
@@ -194,8 +1166,14 @@ class TimeCollection(object):
         if different_days(start, stop, self.virtual_midnight):
             start = stop
         duration = stop - start
-        entry, tags = self._split_entry_and_tags(entry)
-        return Entry(start, stop, duration, tags, entry)
+        info = self._entry_info()[entry]
+        return Entry(start, stop, duration, info.tags, info.title)
+
+    def _entry_info(self):
+        """Return an EntryInfoCache for looking up derived entry fields."""
+        if self.entry_info is not None:
+            return self.entry_info
+        return EntryInfoCache()
 
     def all_entries(self):
         """Iterate over all entries.
@@ -203,17 +1181,50 @@ class TimeCollection(object):
         Yields Entry tuples.  The first entry in each day has a duration
         of 0.
         """
+        return (entry for entry, info in self._entries_and_info())
+
+    def _entries_and_info(self):
+        """Iterate over all entries and their derived fields.
+
+        Yields (Entry, EntryInfo) tuples.
+        """
+        entry_info = self._entry_info()
         stop = None
-        for item in self.items:
+        last_day = None
+        for item, day in zip(self.items, self._virtual_days()):
             start = stop
             stop = item[0]
-            entry = item[1]
-            if start is None or different_days(start, stop,
-                                               self.virtual_midnight):
+            if start is None or day != last_day:
                 start = stop
-            duration = stop - start
-            entry, tags = self._split_entry_and_tags(entry)
-            yield Entry(start, stop, duration, tags, entry)
+                last_day = day
+            info = entry_info[item[1]]
+            yield Entry(start, stop, stop - start, info.tags, info.title), info
+
+    def filtered_entries(self, filter_text):
+        """Iterate over entries with titles that contain a text.
+
+        Yields (position, Entry) tuples, where position refers to the
+        sequence returned by all_entries().
+        """
+        indexed = self._indexed_titles()
+        if indexed is None:
+            for position, entry in enumerate(self.all_entries()):
+                if filter_text in entry.entry:
+                    yield position, entry
+            return
+        title_index, day_index, start, stop = indexed
+        items = day_index.items
+        ordinals = day_index.ordinals
+        entry_info = day_index.entry_info
+        for position in title_index.positions(filter_text, start, stop):
+            time, entry = items[position]
+            if position == start or ordinals[position] != ordinals[position - 1]:
+                last_time = time
+            else:
+                last_time = items[position - 1][0]
+            info = entry_info[entry]
+            yield position - start, Entry(last_time, time, time - last_time,
+                                          info.tags, info.title)
 
     @staticmethod
     def _split_entry_and_tags(entry):
@@ -257,6 +1268,10 @@ class TimeCollection(object):
 
     def set_of_all_tags(self):
         """Return the set of all tags mentioned in entries."""
+        indexed = self._indexed_tags()
+        if indexed is not None:
+            tag_index, day_index, start, stop = indexed
+            return tag_index.tags(start, stop)
         all_tags = set()
         for entry in self.all_entries():
             all_tags.update(entry.tags)
@@ -264,6 +1279,10 @@ class TimeCollection(object):
 
     def count_days(self):
         """Count days that have entries."""
+        indexed = self._indexed_range()
+        if indexed is not None:
+            day_index, start, stop = indexed
+            return day_index.count_days(start, stop)
         count = 0
         last = None
         for entry in self.all_entries():
@@ -273,6 +1292,23 @@ class TimeCollection(object):
                 count += 1
         return count
 
+    def day_starts(self):
+        """Return the positions of entries that are first in their day.
+
+        The positions refer to the sequence returned by all_entries().
+        """
+        indexed = self._indexed_range()
+        if indexed is not None:
+            day_index, start, stop = indexed
+            return day_index.day_starts(start, stop)
+        starts = []
+        last_day = None
+        for n, day in enumerate(self._virtual_days()):
+            if n == 0 or day != last_day:
+                starts.append(n)
+                last_day = day
+        return starts
+
     def grouped_entries(self, skip_first=True):
         """Return consolidated entries (grouped by entry title).
 
@@ -280,17 +1316,20 @@ class TimeCollection(object):
         entries are identified by finding two asterisks in the title.
         Entry lists are sorted, and contain (start, entry, duration) tuples.
         """
+        analytics = self.analytics()
+        if analytics is not None:
+            return analytics.grouped_entries(skip_first)
         work = {}
         slack = {}
-        for start, stop, duration, tags, entry in self.all_entries():
+        for (start, stop, duration, tags, entry), info in self._entries_and_info():
             if skip_first:
                 # XXX: in case of for multi-day windows, this should skip
                 # the 1st entry of each day
                 skip_first = False
                 continue
-            if '***' in entry:
+            if info.skipped:
                 continue
-            if '**' in entry:
+            if info.slacking:
                 entries = slack
             else:
                 entries = work
@@ -327,6 +1366,53 @@ class TimeCollection(object):
             totals[cat] = totals.get(cat, datetime.timedelta(0)) + duration
         return entries, totals
 
+    def tag_totals(self):
+        """Calculate total time of work and slacking entries for every tag.
+
+        Returns a {tag: (total_work, total_slacking)} dict, the same as
+        calling totals(tag) for every tag in set_of_all_tags().
+        """
+        indexed = self._indexed_tags()
+        if indexed is None:
+            return self.summarize().tag_totals
+        tag_index, day_index, start, stop = indexed
+        return {tag: self._indexed_totals(
+                    day_index, start, tag_index.positions(tag, start, stop))
+                for tag in tag_index.tags(start, stop)}
+
+    def summarize(self):
+        """Compute everything reports need to know about this collection.
+
+        Returns a Summary.  This is faster than calling totals(),
+        grouped_entries(), categorized_work_entries(), set_of_all_tags()
+        and count_days() separately, because it goes through the entries
+        only once, or not at all for days that have been summarized
+        before.
+        """
+        indexed = self._indexed_range()
+        if indexed is not None:
+            day_index, start, stop = indexed
+            return Summary.merge(
+                summary for day, summary in day_index.summaries(start, stop))
+        return Summary(self._entries_and_info(), self.count_days())
+
+    def day_summaries(self):
+        """Compute a Summary of every day.
+
+        Returns a list of (date, summary) tuples for days that have entries,
+        in chronological order.
+        """
+        indexed = self._indexed_range()
+        if indexed is not None:
+            day_index, start, stop = indexed
+            return day_index.summaries(start, stop)
+        result = []
+        entries = zip(self._entries_and_info(), self._virtual_days())
+        for day, group in itertools.groupby(entries, itemgetter(1)):
+            summary = Summary((entry for entry, day in group), days=1)
+            result.append((day, summary))
+        return result
+
     def totals(self, tag=None, filter_text=None):
         """Calculate total time of work and slacking entries.
 
@@ -353,35 +1439,192 @@ class TimeCollection(object):
 
         (that is, it would be true if sum could operate on timedeltas).
         """
+        if tag is not None:
+            indexed = self._indexed_tags()
+            if indexed is not None:
+                tag_index, day_index, start, stop = indexed
+                positions = tag_index.positions(tag, start, stop)
+                return self._indexed_totals(day_index, start, positions,
+                                            filter_text)
+        elif filter_text is not None:
+            indexed = self._indexed_titles()
+            if indexed is not None:
+                title_index, day_index, start, stop = indexed
+                positions = title_index.positions(filter_text, start, stop)
+                return self._indexed_totals(day_index, start, positions)
+        else:
+            indexed = self._indexed_range()
+            if indexed is not None:
+                day_index, start, stop = indexed
+                return day_index.totals(start, stop)
         total_work = total_slacking = datetime.timedelta(0)
-        for start, stop, duration, tags, entry in self.all_entries():
+        for (start, stop, duration, tags, entry), info in self._entries_and_info():
             if tag is not None and tag not in tags:
                 continue
             if filter_text is not None and filter_text not in entry:
                 continue
-            if '***' in entry:
+            if info.skipped:
                 continue
-            elif '**' in entry:
+            elif info.slacking:
                 total_slacking += duration
             else:
                 total_work += duration
         return total_work, total_slacking
 
 
+class Summary(object):
+    """Aggregated information about a sequence of entries.
+
+    Attributes, for a TimeCollection's entries:
+
+      first_entry -- the first entry (or None if there are no entries)
+      total_work, total_slacking -- collection.totals()
+      total_skipped -- total duration of entries marked with ***
+      work, slack -- collection.grouped_entries()
+      categories, category_totals -- collection.categorized_work_entries()
+      tags -- collection.set_of_all_tags()
+      tag_totals -- {tag: collection.totals(tag)} for every tag
+      days -- collection.count_days()
+
+    Treat all of these as read-only.
+
+    ``entries`` are (Entry, EntryInfo) tuples.
+
+    Summaries of consecutive days can be merged into a summary of the
+    whole period, which is how TimeLog reuses summaries of past days.
+    """
+
+    def __init__(self, entries=(), days=0):
+        zero = datetime.timedelta(0)
+        self.first_entry = None
+        total_work = total_slacking = total_skipped = zero
+        work = {}
+        slack = {}
+        tag_totals = {}
+        for item, info in entries:
+            start, stop, duration, tags, entry = item
+            if info.skipped:
+                total_skipped += duration
+                for tag in tags:
+                    if tag not in tag_totals:
+                        tag_totals[tag] = (zero, zero)
+            elif info.slacking:
+                total_slacking += duration
+                for tag in tags:
+                    tag_work, tag_slacking = tag_totals.get(tag, (zero, zero))
+                    tag_totals[tag] = (tag_work, tag_slacking + duration)
+            else:
+                total_work += duration
+                for tag in tags:
+                    tag_work, tag_slacking = tag_totals.get(tag, (zero, zero))
+                    tag_totals[tag] = (tag_work + duration, tag_slacking)
+            if self.first_entry is None:
+                # see grouped_entries()
+                self.first_entry = item
+            elif not info.skipped:
+                self._add_to_group(slack if info.slacking else work,
+                                   start, entry, duration)
+        self.total_work = total_work
+        self.total_slacking = total_slacking
+        self.total_skipped = total_skipped
+        self.tag_totals = tag_totals
+        self.days = days
+        self._finish(work, slack)
+
+    @staticmethod
+    def _add_to_group(entries, start, entry, duration):
+        if entry in entries:
+            old_start, old_entry, old_duration = entries[entry]
+            start = min(start, old_start)
+            duration += old_duration
+        entries[entry] = (start, entry, duration)
+
+    def _finish(self, work, slack):
+        self.work = sorted(work.values())
+        self.slack = sorted(slack.values())
+        self.categories = {}
+        self.category_totals = {}
+        for start, entry, duration in self.work:
+            cat, task = TimeCollection.split_category(entry)
+            self.categories.setdefault(cat, []).append((start, task, duration))
+            self.category_totals[cat] = (
+                self.category_totals.get(cat, datetime.timedelta(0))
+                + duration)
+        self.tags = set(self.tag_totals)
+
+    @classmethod
+    def merge(cls, summaries):
+        """Combine summaries of consecutive periods, in order."""
+        result = cls()
+        work = {}
+        slack = {}
+        tag_totals = result.tag_totals
+        for summary in summaries:
+            if summary.first_entry is None:
+                continue
+            if result.first_entry is None:
+                result.first_entry = summary.first_entry
+            else:
+                start, stop, duration, tags, entry = summary.first_entry
+                if '***' not in entry:
+                    cls._add_to_group(slack if '**' in entry else work,
+                                      start, entry, duration)
+            for start, entry, duration in summary.work:
+                cls._add_to_group(work, start, entry, duration)
+            for start, entry, duration in summary.slack:
+                cls._add_to_group(slack, start, entry, duration)
+            result.total_work += summary.total_work
+            result.total_slacking += summary.total_slacking
+            result.total_skipped += summary.total_skipped
+            for tag, (tag_work, tag_slacking) in summary.tag_totals.items():
+                if tag in tag_totals:
+                    old_work, old_slacking = tag_totals[tag]
+                    tag_work += old_work
+                    tag_slacking += old_slacking
+                tag_totals[tag] = (tag_work, tag_slacking)
+            result.days += summary.days
+        result._finish(work, slack)
+        return result
+
+
 class TimeWindow(TimeCollection):
     """A window into a time log.
 
     Includes all events that took place between min_timestamp and
     max_timestamp.  Includes events that took place at min_timestamp, but
     excludes events that took place at max_timestamp.
+
+    The original items must be sorted by timestamp.  The window finds its
+    boundaries with a binary search (unless you pass the ``bounds`` of the
+    items yourself) and shares the original's items instead of copying them.
     """
 
-    def __init__(self, original, min_timestamp, max_timestamp):
+    def __init__(self, original, min_timestamp, max_timestamp, bounds=None):
         super(TimeWindow, self).__init__(original.virtual_midnight)
         self.min_timestamp = min_timestamp
         self.max_timestamp = max_timestamp
-        self.items = [item for item in original.items
-                      if min_timestamp <= item[0] < max_timestamp]
+        items = original.items
+        if bounds is not None:
+            start, stop = bounds
+        else:
+            # (timestamp,) sorts before any (timestamp, event_title) tuple
+            start = bisect_left(items, (min_timestamp,))
+            stop = bisect_left(items, (max_timestamp,), start)
+        self.items = ItemsSlice(items, start, stop)
+        self.day_index = getattr(original, 'day_index', None)
+        self.tag_index = original.tag_index
+        self.title_index = original.title_index
+        self.entry_info = original.entry_info
+
+    def _indexed_range(self):
+        day_index = self.day_index
+        items = self.items
+        if (day_index is not None and isinstance(items, ItemsSlice)
+                and items._items is day_index.items
+                and items.stop <= len(day_index)
+                and day_index.virtual_midnight == self.virtual_midnight):
+            return day_index, items.start, items.stop
+        return None
 
     def __repr__(self):
         return '<TimeWindow: {}..{}>'.format(self.min_timestamp,
@@ -523,15 +1766,16 @@ class Reports(object):
             output.write("Subject: %s\n" % subject)
             output.write('\n')
 
-        items = list(window.all_entries())
-        if not items:
+        summary = window.summarize()
+        if summary.first_entry is None:
             output.write("No work done this %s.\n" % period_name)
             return
         output.write(" " * 46)
         output.write("                   time\n")
 
-        total_work, total_slacking = window.totals()
-        entries, totals = window.categorized_work_entries()
+        total_work = summary.total_work
+        entries = dict(summary.categories)
+        totals = dict(summary.category_totals)
         if entries:
             if None in entries:
                 e = entries.pop(None)
@@ -572,11 +1816,10 @@ class Reports(object):
         for time, cat in ordered_by_time:
             output.write(line_format % (cat, format_duration_short(time)))
 
-        tags = self.window.set_of_all_tags()
-        if tags:
-            self._report_tags(output, tags)
+        if summary.tags:
+            self._report_tags(output, summary.tags, summary.tag_totals)
 
-    def _report_tags(self, output, tags):
+    def _report_tags(self, output, tags, tag_totals=None):
         """Helper method that lists time spent per tag.
 
         Use this to add a section in a report looks similar to this:
@@ -589,6 +1832,10 @@ class Reports(object):
         as a single entry can have multiple or no tags at all!
 
         Argument `tags` is a set of tags (string).  It is not modified.
+
+        Argument `tag_totals`, if given, maps every tag to its
+        (work, slacking) totals, like Summary.tag_totals.  Otherwise
+        the totals are computed by calling self.window.totals().
         """
         output.write('\n')
         output.write('Time spent in each area:\n')
@@ -596,7 +1843,10 @@ class Reports(object):
         # sum work and slacking time per tag; we do not care in this report
         tags_totals = {}
         for tag in tags:
-            spent_working, spent_slacking = self.window.totals(tag)
+            if tag_totals is not None:
+                spent_working, spent_slacking = tag_totals[tag]
+            else:
+                spent_working, spent_slacking = self.window.totals(tag)
             tags_totals[tag] = spent_working + spent_slacking
         # compute width of tag label column
         max_tag_length = max([len(tag) for tag in tags_totals.keys()])
@@ -648,14 +1898,14 @@ class Reports(object):
             output.write('Subject: %s\n' % subject)
             output.write('\n')
 
-        items = list(window.all_entries())
-        if not items:
+        summary = window.summarize()
+        if summary.first_entry is None:
             output.write("No work done this %s.\n" % period_name)
             return
         output.write(" " * 46)
         output.write("                time\n")
-        work, slack = window.grouped_entries()
-        total_work, total_slacking = window.totals()
+        work = summary.work
+        total_work = summary.total_work
         categories = {}
         if work:
             work = [(entry, duration) for start, entry, duration in work]
@@ -678,9 +1928,8 @@ class Reports(object):
         if categories:
             self._report_categories(output, categories)
 
-        tags = self.window.set_of_all_tags()
-        if tags:
-            self._report_tags(output, tags)
+        if summary.tags:
+            self._report_tags(output, summary.tags, summary.tag_totals)
 
     def weekly_report_subject(self, who):
         week = self.window.min_timestamp.isocalendar()[1]
@@ -759,16 +2008,17 @@ class Reports(object):
             output.write(u"To: %s\n" % email)
             output.write(u"Subject: %s\n" % self.daily_report_subject(who))
             output.write('\n')
-        items = list(window.all_entries())
-        if not items:
+        summary = window.summarize()
+        if summary.first_entry is None:
             output.write("No work done today.\n")
             return
-        start, stop, duration, tags, entry = items[0]
+        start, stop, duration, tags, entry = summary.first_entry
         entry = entry[:1].upper() + entry[1:]
         output.write("%s at %s\n" % (entry, start.strftime('%H:%M')))
         output.write('\n')
-        work, slack = window.grouped_entries()
-        total_work, total_slacking = window.totals()
+        work, slack = summary.work, summary.slack
+        total_work = summary.total_work
+        total_slacking = summary.total_slacking
         categories = {}
         if work:
             for start, entry, duration in work:
@@ -796,9 +2046,8 @@ class Reports(object):
         output.write("Time spent slacking: %s\n" %
                      format_duration_long(total_slacking))
 
-        tags = self.window.set_of_all_tags()
-        if tags:
-            self._report_tags(output, tags)
+        if summary.tags:
+            self._report_tags(output, summary.tags, summary.tag_totals)
 
 
 class ReportRecord(object):
@@ -888,13 +2137,82 @@ class TimeLog(TimeCollection):
 
     A time log contains a time window for today, and can add new entries at
     the end.
+
+    If you specify a ``cache_filename``, the parsed entries are saved there
+    and loaded back the next time, so only the lines that were appended to
+    the log file in the meantime have to be parsed.
+
+    If you specify ``columnar=True``, self.items will be a ColumnarItems
+    instance instead of a list.  This saves a lot of memory for large logs.
+
+    self.day_index is a DayIndex of self.items.  It's rebuilt when you
+    change self.virtual_midnight.  self.tag_index is a TagIndex and
+    self.title_index is a TitleIndex of self.items.
+
+    self.version is incremented every time self.items or
+    self.virtual_midnight change, so you can use it to tell when
+    anything computed from the time log needs to be recomputed.
+
+    If you specify ``today_only=True``, the log file is read backwards from
+    the end, and self.items has only today's entries and the one before
+    them.  That's enough for today's window, for append() and for
+    parse_correction(), and it takes the same time no matter how big the
+    log file is.  Use it when you don't need the history, or to show
+    something while the full log is being loaded.
     """
 
-    def __init__(self, filename, virtual_midnight):
+    # Bump this whenever the format of the cache file changes
+    cache_format = 1
+
+    # How much of the log file to read at a time when today_only is set
+    tail_block_size = 8 * 1024
+
+    def __init__(self, filename, virtual_midnight, cache_filename=None,
+                 columnar=False, today_only=False):
+        self.entry_info = EntryInfoCache()
+        self.version = 0
         super(TimeLog, self).__init__(virtual_midnight)
         self.filename = filename
+        self.cache_filename = cache_filename
+        self.columnar = columnar
+        self.today_only = today_only
         self.reread()
 
+    @property
+    def virtual_midnight(self):
+        return self._virtual_midnight
+
+    @virtual_midnight.setter
+    def virtual_midnight(self, virtual_midnight):
+        self._virtual_midnight = virtual_midnight
+        self.day_index = DayIndex(self.items, virtual_midnight,
+                                  self.entry_info)
+        self.version += 1
+
+    def _update_indexes(self):
+        self.version += 1
+        if self.day_index.items is self.items:
+            self.day_index.update()
+        else:
+            self.day_index = DayIndex(self.items, self.virtual_midnight,
+                                      self.entry_info)
+        if self.tag_index is not None and self.tag_index.items is self.items:
+            if len(self.tag_index):
+                self.tag_index.update()
+        else:
+            self.tag_index = TagIndex(self.items, self.entry_info)
+        if (self.title_index is not None
+                and self.title_index.items is self.items):
+            if len(self.title_index):
+                self.title_index.update()
+        else:
+            self.title_index = TitleIndex(self.items, self.entry_info)
+
+    def _indexed_range(self):
+        if self.day_index.items is not self.items:
+            return None
+        return self.day_index, 0, len(self.items)
+
     def virtual_today(self):
         """Return today's date, adjusted for virtual midnight."""
         return virtual_day(datetime.datetime.now(), self.virtual_midnight)
@@ -902,11 +2220,15 @@ class TimeLog(TimeCollection):
     def check_reload(self):
         """Look at the mtime of timelog.txt, and reload it if necessary.
 
+        If new lines were only appended at the end of the file since the
+        last time it was read, only those new lines are parsed.
+
         Returns True if the file was reloaded.
         """
         mtime = get_mtime(self.filename)
         if mtime != self.last_mtime:
-            self.reread()
+            if not self.read_appended():
+                self.reread()
             return True
         else:
             return False
@@ -915,22 +2237,205 @@ class TimeLog(TimeCollection):
         """Reload the log file."""
         self.day = self.virtual_today()
         self.last_mtime = get_mtime(self.filename)
+        # The size and the checksum of the part of the file that we've parsed
+        # let read_appended() notice when somebody only appended new lines.
+        self._parsed_size = 0
+        self._checksum = md5()
         try:
             if hasattr(self.filename, 'read'):
                 # accept any file-like object
                 # this is a hook for unit tests, really
                 self.filename.seek(0)
-                self.items = self._read(self.filename)
+                self.items = self._new_items(self._read(self.filename))
+                self._checksum = None
+            elif self.today_only:
+                with open(self.filename, 'rb') as f:
+                    self._read_tail(f)
             else:
                 with open(self.filename, 'rb') as f:
-                    data = f.read()
-                self.items = self._read(data.decode('UTF-8').splitlines())
+                    self._read_file(f)
         except IOError:
-            self.items = []
+            self.items = self._new_items()
+        self._update_indexes()
         self.window = self.window_for_day(self.day)
 
+    def _new_items(self, items=()):
+        if self.columnar:
+            return ColumnarItems(items)
+        else:
+            return list(items)
+
+    def _read_file(self, f):
+        if not os.fstat(f.fileno()).st_size:
+            # mmap refuses to map empty files
+            self._read_data(b'')
+            return
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (mmap.error, ValueError):
+            self._read_data(f.read())
+        else:
+            with closing(data):
+                self._read_data(data)
+
+    def _read_tail(self, f):
+        min = datetime.datetime.combine(self.day, self.virtual_midnight)
+        items = self._read_bytes(self._tail(f, min))
+        # Keep the last entry before today: append() and valid_time() need it
+        start = max(0, bisect_left(items, (min, )) - 1)
+        self.items = self._new_items(items[start:])
+        # We don't know what precedes the tail, so read_appended() can't work
+        self._checksum = None
+
+    def _tail(self, f, since):
+        """Read the end of a log file, starting before a given time.
+
+        Reads the file backwards, tail_block_size bytes at a time, until it
+        finds an entry older than ``since`` (or reaches the beginning of the
+        file).  Returns the bytes from the start of the first complete line
+        that it has read.
+        """
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        blocks = []
+        while pos > 0:
+            size = min(pos, self.tail_block_size)
+            pos -= size
+            f.seek(pos)
+            block = f.read(size)
+            blocks.append(block)
+            if pos and self._first_time(block) < since:
+                break
+        data = b''.join(reversed(blocks))
+        if pos:
+            # Skip the line we've jumped into the middle of
+            data = data[data.find(b'\n') + 1:]
+        return data
+
+    def _first_time(self, block):
+        """Return the time of the first complete entry in a block of bytes.
+
+        Returns datetime.datetime.max if there isn't one.
+        """
+        newline = block.find(b'\n')
+        if newline != -1:
+            for m in self._line_rx.finditer(block, newline + 1):
+                year, month, day, hour, min = map(int, m.groups()[:5])
+                try:
+                    return datetime.datetime(year, month, day, hour, min)
+                except ValueError:
+                    continue
+        return datetime.datetime.max
+
+    def _read_data(self, data):
+        self.items = self._new_items()
+        cache = self._load_cache()
+        if cache is not None:
+            size, mtime, digest, items = cache
+            prefix = data[:size]
+            checksum = md5(prefix)
+            if len(prefix) == size and checksum.hexdigest() == digest:
+                self.items = items
+                self._parsed_size = size
+                self._checksum = checksum
+                if size == len(data):
+                    data = b''
+                else:
+                    data = data[size:]
+        self._remember_parsed(data)
+        self._add_items(self._read_bytes(data))
+        if cache is None or cache[:3] != self._cache_key():
+            self._save_cache()
+
+    def _cache_key(self):
+        if self._checksum is None:
+            return None
+        return (self._parsed_size, self.last_mtime, self._checksum.hexdigest())
+
+    def _load_cache(self):
+        if not self.cache_filename:
+            return None
+        try:
+            with open(self.cache_filename, 'rb') as f:
+                format, size, mtime, digest, items = pickle.load(f)
+        except Exception:
+            # Missing, corrupted, or written by an incompatible Python version
+            return None
+        if format != self.cache_format:
+            return None
+        if isinstance(items, ColumnarItems) != self.columnar:
+            return None
+        return size, mtime, digest, items
+
+    def _save_cache(self):
+        key = self._cache_key()
+        if not self.cache_filename or key is None:
+            return
+        tempname = self.cache_filename + '.tmp'
+        try:
+            with open(tempname, 'wb') as f:
+                pickle.dump((self.cache_format,) + key + (self.items,), f,
+                            pickle.HIGHEST_PROTOCOL)
+            if os.path.exists(self.cache_filename):
+                # Windows doesn't let os.rename() overwrite files
+                os.unlink(self.cache_filename)
+            os.rename(tempname, self.cache_filename)
+        except (IOError, OSError):
+            pass  # it's only a cache
+
+    def _remember_parsed(self, data):
+        if data[-1:] not in (b'', b'\n'):
+            # An incomplete last line might be continued by the next write,
+            # and then we'd have to parse it again.  Let's not bother.
+            self._parsed_size = None
+            self._checksum = None
+            return
+        self._parsed_size += len(data)
+        self._checksum.update(data)
+
+    def _add_items(self, new_items):
+        if new_items and self.items and new_items[0][0] < self.items[-1][0]:
+            # Somebody appended entries out of order.  Note that the sort is
+            # stable, so entries with the same timestamp remain in file order.
+            # We don't sort in place because existing TimeWindows refer to
+            # the old list.
+            items = list(self.items) + new_items
+            items.sort(key=itemgetter(0))
+            self.items = self._new_items(items)
+        else:
+            self.items.extend(new_items)
+        self._update_indexes()
+
+    def read_appended(self):
+        """Parse the lines appended at the end of the log file.
+
+        Returns False if the file was changed in some other way (or if we
+        don't know what we've parsed previously), in which case you need to
+        call reread().
+        """
+        if self._checksum is None:
+            return False
+        mtime = get_mtime(self.filename)
+        try:
+            with open(self.filename, 'rb') as f:
+                prefix = f.read(self._parsed_size)
+                if (len(prefix) != self._parsed_size
+                        or md5(prefix).digest() != self._checksum.digest()):
+                    return False
+                data = f.read()
+        except IOError:
+            return False
+        self.last_mtime = mtime
+        self._remember_parsed(data)
+        self._add_items(self._read_bytes(data))
+        self.day = self.virtual_today()
+        self.window = self.window_for_day(self.day)
+        return True
+
     def _read(self, f):
+        """Parse timelog entries from an iterable of text lines."""
         items = []
+        intern = self.entry_info.intern
         for line in f:
             time, sep, entry = line.partition(': ')
             if not sep:
@@ -939,7 +2444,7 @@ class TimeLog(TimeCollection):
                 time = parse_datetime(time)
             except ValueError:
                 continue
-            entry = entry.strip()
+            entry = intern(entry.strip())
             items.append((time, entry))
         # There's code that relies on entries being sorted.  The entries really
         # should be already sorted in the file, but sometimes the user edits
@@ -951,6 +2456,35 @@ class TimeLog(TimeCollection):
         items.sort(key=itemgetter(0))
         return items
 
+    _line_rx = re.compile(
+        br'^(\d\d\d\d)-(\d\d)-(\d\d) (\d\d):(\d\d): (.*)$', re.MULTILINE)
+
+    def _read_bytes(self, data):
+        """Parse timelog entries from a bytes-like object.
+
+        This is like decoding ``data`` and passing the lines to _read(),
+        except that the timestamps are parsed straight from the raw bytes
+        and only the entry text gets decoded.  It is about as fast, but
+        works on memory-mapped files without copying them into memory.
+
+        Only ``\n`` (and ``\r\n``) end a line: unlike str.splitlines(),
+        a lone ``\r``, ``\x0c``, ``\x85`` or ``\u2028`` doesn't.
+        """
+        items = []
+        append = items.append
+        intern = self.entry_info.intern
+        for m in self._line_rx.finditer(data):
+            year, month, day, hour, min, entry = m.groups()
+            try:
+                time = datetime.datetime(int(year), int(month), int(day),
+                                         int(hour), int(min))
+            except ValueError:
+                continue
+            append((time, intern(entry.decode('UTF-8').strip())))
+        # See the comment in _read() about sorting.
+        items.sort(key=itemgetter(0))
+        return items
+
     def window_for(self, min, max):
         """Return a TimeWindow for a specified time interval.
 
@@ -963,7 +2497,9 @@ class TimeLog(TimeCollection):
         """Return a TimeWindow for the specified day."""
         min = datetime.datetime.combine(date, self.virtual_midnight)
         max = min + datetime.timedelta(1)
-        return self.window_for(min, max)
+        if self._indexed_range() is None:
+            return self.window_for(min, max)
+        return TimeWindow(self, min, max, self.day_index.day_range(date))
 
     def window_for_week(self, date):
         """Return a TimeWindow for the week that contains date."""
@@ -995,12 +2531,15 @@ class TimeLog(TimeCollection):
 
     def raw_append(self, line, need_space):
         """Append a line to the time log file."""
-        f = codecs.open(self.filename, "a", encoding='UTF-8')
+        text = line + '\n'
         if need_space:
-            f.write('\n')
-        f.write(line + '\n')
+            text = '\n' + text
+        f = codecs.open(self.filename, "a", encoding='UTF-8')
+        f.write(text)
         f.close()
         self.last_mtime = get_mtime(self.filename)
+        if self._checksum is not None:
+            self._remember_parsed(text.encode('UTF-8'))
 
     def append(self, entry, now=None):
         """Append a new entry to the time log."""
@@ -1011,8 +2550,10 @@ class TimeLog(TimeCollection):
         last = self.last_time()
         if last and different_days(now, last, self.virtual_midnight):
             need_space = True
-        self.items.append((now, entry))
-        self.window.items.append((now, entry))
+        # _add_items() keeps the items sorted even if ``now`` is in the past
+        self._add_items([(now, self.entry_info.intern(entry))])
+        self.day = self.virtual_today()
+        self.window = self.window_for_day(self.day)
         line = '%s: %s' % (now.strftime("%Y-%m-%d %H:%M"), entry)
         self.raw_append(line, need_space)
 